@@ -34,10 +34,14 @@ import json
 import sys
 import os
 import subprocess
-import argparse
+import types
 import shutil
 import re
 import unicodedata
+import functools
+import bisect
+import heapq
+import mmap
 from pathlib import Path
 from datetime import datetime, timedelta, timezone
 import time
@@ -52,6 +56,22 @@ BLOCK_STATS_CACHE_FILE = None
 TRANSCRIPT_STATS_CACHE_TTL = 15  # 15 seconds
 TRANSCRIPT_STATS_CACHE_FILE = None
 
+# Transcript byte-offset index (lets load_all_messages_chronologically skip to `since`)
+TRANSCRIPT_OFFSET_INDEX_FILE = None
+
+# JSONL 行ループ用の読み込みバッファ（既定 8 KiB だと数 MB の transcript で read() が多すぎる）
+JSONL_READ_BUFFER = 1 << 16  # 64 KiB
+
+# Error log (path string resolved lazily, once per process)
+ERROR_LOG_FILE = None
+ERROR_LOG_REPEAT_WINDOW = 5  # seconds: 同じエラーの連続書き込みを抑制
+
+# Git status cache settings (keyed by directory + .git/HEAD & .git/index mtime)
+GIT_STATUS_CACHE_TTL = 5  # 5 seconds (unstaged edits don't touch the index)
+GIT_STATUS_CACHE_FILE = None
+
+# Weekly sparkline per-file cache (keyed by resets_at + file mtime/size)
+WEEKLY_FILE_CACHE_FILE = None
 
 # Auto-update settings
 AUTO_UPDATE_CHECK_TTL = 14400  # 4 hours
@@ -126,13 +146,47 @@ class Colors:
 # Create single instance
 Colors = Colors()
 
+_LABEL_CACHE = {}
+
+def _label(text, color='BRIGHT_CYAN'):
+    """固定ラベル（color + text + RESET、既定は BRIGHT_CYAN）を色状態ごとにキャッシュして返す"""
+    key = (Colors.RESET, color, text)
+    label = _LABEL_CACHE.get(key)
+    if label is None:
+        label = _LABEL_CACHE[key] = getattr(Colors, color) + text + Colors.RESET
+    return label
+
 # ========================================
 # TERMINAL WIDTH UTILITIES
 # ========================================
 
+_ANSI_RE = re.compile(r'\x1b\[[0-9;]*m')
+
 def strip_ansi(text):
-    """ANSIエスケープコードを除去"""
-    return re.sub(r'\x1b\[[0-9;]*m', '', text)
+    """ANSIエスケープコードを除去（ESC を含まなければ正規表現を通さずそのまま返す）"""
+    if '\x1b' not in text:
+        return text
+    return _ANSI_RE.sub('', text)
+
+# 連続した SGR シーケンス（ESC[..m が 2 つ以上並ぶ箇所）
+_ANSI_RUN_RE = re.compile(r'(?:\x1b\[[0-9;]*m){2,}')
+
+def _merge_sgr_run(match):
+    """ESC[a m ESC[b m ... を ESC[a;b;...m 1 つにまとめる
+
+    途中に RESET (ESC[0m / ESC[m) があれば、それより前のコードは打ち消されるので捨てる。
+    """
+    params = []
+    for code in match.group(0)[2:-1].split('m\x1b['):
+        if code in ('', '0'):
+            params = ['0']
+        else:
+            params.append(code)
+    return '\x1b[' + ';'.join(params) + 'm'
+
+def _coalesce_ansi(text):
+    """隣接する ANSI カラーコードを 1 シーケンスに結合（表示は同じ、出力バイト数を削減）"""
+    return _ANSI_RUN_RE.sub(_merge_sgr_run, text)
 
 def get_display_width(text):
     """表示幅を計算（絵文字/CJK対応）
@@ -141,10 +195,14 @@ def get_display_width(text):
     East Asian Width が 'W' (Wide) または 'F' (Fullwidth) の文字は幅2、それ以外は幅1。
     """
     clean = strip_ansi(text)
-    width = 0
+    # ASCII だけなら全て幅1（文字ごとの East Asian Width 参照は不要）
+    if clean.isascii():
+        return len(clean)
+    east_asian_width = unicodedata.east_asian_width
+    width = len(clean)
     for char in clean:
-        ea = unicodedata.east_asian_width(char)
-        width += 2 if ea in ('W', 'F') else 1
+        if east_asian_width(char) in ('W', 'F'):
+            width += 1
     return width
 
 def get_terminal_size():
@@ -166,8 +224,20 @@ def get_terminal_size():
     raw_height = 0
 
     try:
+        # 4. の COLUMNS/LINES は有効な整数なら最後に必ず上書きするので先に読み、
+        #    上書きされる次元のためのプローブ（tmux/tput の fork/exec）を省く
+        env_width = env_height = None
+        try:
+            env_width = int(os.environ['COLUMNS'])
+        except (KeyError, ValueError):
+            pass
+        try:
+            env_height = int(os.environ['LINES'])
+        except (KeyError, ValueError):
+            pass
+
         # 1. tmux: 1コマンドで幅・高さ同時取得（最も正確）
-        if 'TMUX' in os.environ:
+        if 'TMUX' in os.environ and (env_width is None or env_height is None):
             try:
                 pane_id = os.environ.get('TMUX_PANE', '')
                 cmd = ['tmux', 'display-message', '-p', '#{pane_width} #{pane_height}']
@@ -198,7 +268,7 @@ def get_terminal_size():
                 pass
 
         # 3. tput cols/lines (TERM依存)
-        if raw_width == 0:
+        if raw_width == 0 and env_width is None:
             try:
                 result = subprocess.run(
                     ['tput', 'cols'],
@@ -208,7 +278,7 @@ def get_terminal_size():
                     raw_width = int(result.stdout.strip())
             except (subprocess.TimeoutExpired, FileNotFoundError, OSError):
                 pass
-        if raw_height == 0:
+        if raw_height == 0 and env_height is None:
             try:
                 result = subprocess.run(
                     ['tput', 'lines'],
@@ -220,16 +290,10 @@ def get_terminal_size():
                 pass
 
         # 4. COLUMNS/LINES 環境変数 (override: 個別上書き対応)
-        if 'COLUMNS' in os.environ:
-            try:
-                raw_width = int(os.environ['COLUMNS'])
-            except ValueError:
-                pass
-        if 'LINES' in os.environ:
-            try:
-                raw_height = int(os.environ['LINES'])
-            except ValueError:
-                pass
+        if env_width is not None:
+            raw_width = env_width
+        if env_height is not None:
+            raw_height = env_height
 
     except (OSError, AttributeError):
         pass
@@ -334,9 +398,10 @@ def get_total_tokens(usage_data):
     if not usage_data:
         return 0
     
+    get = usage_data.get  # 集計ループから毎メッセージ呼ばれるので属性参照を 1 回に
     # Handle both field name variations
-    input_tokens = usage_data.get('input_tokens', 0)
-    output_tokens = usage_data.get('output_tokens', 0)
+    input_tokens = get('input_tokens', 0)
+    output_tokens = get('output_tokens', 0)
     
     # Cache creation tokens - external tool compatible logic
     # Use direct field first, fallback to nested if not present
@@ -346,8 +411,8 @@ def get_total_tokens(usage_data):
         cache_creation = usage_data['cache_creation'].get('ephemeral_5m_input_tokens', 0)
     else:
         cache_creation = (
-            usage_data.get('cacheCreationInputTokens', 0) or
-            usage_data.get('cacheCreationTokens', 0)
+            get('cacheCreationInputTokens', 0) or
+            get('cacheCreationTokens', 0)
         )
     
     # Cache read tokens - external tool compatible logic  
@@ -357,8 +422,8 @@ def get_total_tokens(usage_data):
         cache_read = usage_data['cache_read'].get('ephemeral_5m_input_tokens', 0)
     else:
         cache_read = (
-            usage_data.get('cacheReadInputTokens', 0) or
-            usage_data.get('cacheReadTokens', 0)
+            get('cacheReadInputTokens', 0) or
+            get('cacheReadTokens', 0)
         )
     
     return input_tokens + output_tokens + cache_creation + cache_read
@@ -450,6 +515,11 @@ def format_token_count(tokens):
         return f"{tokens / 1000:.1f}K"
     return str(tokens)
 
+@functools.lru_cache(maxsize=8)
+def _format_context_size(context_size, short=False):
+    """Context window denominator (200K/1M 等ほぼ定数) の表示文字列を memoize"""
+    return format_token_count_short(context_size) if short else format_token_count(context_size)
+
 def format_token_count_short(tokens):
     """Format token count for display (3 significant digits)"""
     if tokens >= 1000000:
@@ -466,6 +536,16 @@ def format_token_count_short(tokens):
             return f"{val:.1f}K"         # 14.0K, 99.5K
     return str(tokens)
 
+if sys.version_info >= (3, 11):
+    # 3.11+ の fromisoformat は末尾 'Z' をそのまま受け付ける（文字列コピー不要）
+    _parse_ts = datetime.fromisoformat
+else:
+    def _parse_ts(ts):
+        """ISO 8601 タイムスタンプ（末尾 'Z' 対応）を datetime に変換"""
+        if ts[-1:] == 'Z':
+            ts = ts[:-1] + '+00:00'
+        return datetime.fromisoformat(ts)
+
 def convert_utc_to_local(utc_time):
     """Convert UTC timestamp to local time (common utility)"""
     if hasattr(utc_time, 'tzinfo') and utc_time.tzinfo:
@@ -510,14 +590,8 @@ def calculate_dynamic_padding(compact_text, session_text):
         str: Padding spaces for session line
     """
     # Remove ANSI color codes for accurate length calculation
-    import re
-    clean_compact = re.sub(r'\x1b\[[0-9;]*m', '', compact_text)
-    clean_session = re.sub(r'\x1b\[[0-9;]*m', '', session_text)
-    
-    compact_len = len(clean_compact)
-    session_len = len(clean_session)
-    
-    
+    compact_len = len(strip_ansi(compact_text))
+    session_len = len(strip_ansi(session_text))
     
     if session_len < compact_len:
         return ' ' * (compact_len - session_len + 1)  # +1 for visual adjustment
@@ -538,29 +612,50 @@ def get_progress_bar(percentage, width=20, show_current_segment=False):
     dim_color = get_percentage_color_dim(percentage)
 
     if show_current_segment and filled < width:
-        completed_bar = color + '█' * filled if filled > 0 else ''
-        current_bar = Colors.BRIGHT_WHITE + '▓' + Colors.RESET
-        remaining = width - filled - 1
-        remaining_bar = Colors.LIGHT_GRAY + '▒' * remaining + Colors.RESET if remaining > 0 else ''
-        bar = completed_bar + current_bar + remaining_bar
+        bar = _render_segment_bar(filled, width, color, Colors.BRIGHT_WHITE,
+                                  Colors.LIGHT_GRAY, Colors.RESET)
     else:
-        bar = color + '█' * filled
-        if has_fraction:
-            bar += dim_color + '█'
-            empty = width - filled - 1
-        else:
-            empty = width - filled
-        bar += Colors.LIGHT_GRAY + '▒' * empty + Colors.RESET
+        bar = _render_filled_bar(filled, has_fraction, width, color, dim_color,
+                                 Colors.LIGHT_GRAY, Colors.RESET)
 
     return bar
 
+@functools.lru_cache(maxsize=256)
+def _render_segment_bar(filled, width, color, current_color, empty_color, reset):
+    """現在セグメント強調付きプログレスバー文字列をメモ化して生成"""
+    completed_bar = color + '█' * filled if filled > 0 else ''
+    current_bar = current_color + '▓' + reset
+    remaining = width - filled - 1
+    remaining_bar = empty_color + '▒' * remaining + reset if remaining > 0 else ''
+    return completed_bar + current_bar + remaining_bar
+
+@functools.lru_cache(maxsize=256)
+def _render_filled_bar(filled, has_fraction, width, color, dim_color, empty_color, reset):
+    """塗りつぶし済みプログレスバー文字列をメモ化して生成
+
+    色コードも引数に含めるため NO_COLOR の実行時切替でも正しい結果になる。
+    """
+    bar = color + '█' * filled
+    if has_fraction:
+        bar += dim_color + '█'
+        empty = width - filled - 1
+    else:
+        empty = width - filled
+    return bar + empty_color + '▒' * empty + reset
+
 # REMOVED: create_line_graph() - unused function (replaced by create_mini_chart)
 
 # REMOVED: create_bar_chart() - unused function (replaced by create_horizontal_chart)
 
+# Sparkline block characters (low → high)
+_SPARK_CHARS = ("▁", "▂", "▃", "▄", "▅", "▆", "▇", "█")
+
 def create_sparkline(values, width=20, current_pos=None, future_style="block"):
     """Create a compact sparkline graph.
 
+    Adjacent cells with the same color share one escape sequence (run-length),
+    and a single RESET closes the line.
+
     Args:
         values: List of numeric values to plot
         width: Display width in characters
@@ -571,10 +666,10 @@ def create_sparkline(values, width=20, current_pos=None, future_style="block"):
     if not values:
         return ""
 
-    # Use unicode block characters for sparkline
-    chars = ["▁", "▂", "▃", "▄", "▅", "▆", "▇", "█"]
-
+    chars = _SPARK_CHARS
     data_width = min(width, len(values))
+    if data_width <= 0:
+        return ""
 
     # Calculate current segment boundary
     current_segment = data_width  # default: all segments are "past"
@@ -585,44 +680,44 @@ def create_sparkline(values, width=20, current_pos=None, future_style="block"):
 
     max_val = max(values)
     min_val = min(values)
+    # Colors.* は参照ごとに環境変数を見るので、色はループ外で 1 回だけ取得
+    reset = Colors.RESET
+    future_color = Colors.FUTURE_GRAY
+    # Future segments (strictly after current) は常に末尾に連続する
+    past = min(data_width, current_segment + 1)
+    future_run = (future_color, chars[0] * (data_width - past)) if past < data_width else ()
 
     if max_val == min_val:
-        # All values are the same
-        sparkline = ""
-        for i in range(data_width):
-            if i > current_segment:
-                sparkline += Colors.FUTURE_GRAY + chars[0] + Colors.RESET
-            elif max_val == 0:
-                sparkline += Colors.LIGHT_GRAY + chars[0] + Colors.RESET
-            else:
-                sparkline += Colors.BRIGHT_GREEN + chars[4] + Colors.RESET
-        return sparkline
-
-    sparkline = ""
-    step = len(values) / data_width if len(values) > data_width else 1
-
-    for i in range(data_width):
-        # Future segments (strictly after current)
-        if i > current_segment:
-            sparkline += Colors.FUTURE_GRAY + chars[0] + Colors.RESET
-            continue
+        # All values are the same: past 区間は同じセルの繰り返し
+        if max_val == 0:
+            flat = (Colors.LIGHT_GRAY, chars[0] * past)
+        else:
+            flat = (Colors.BRIGHT_GREEN, chars[4] * past)
+        return "".join(flat + future_run) + reset
+
+    n_values = len(values)
+    step = n_values / data_width if n_values > data_width else 1
+    span = max_val - min_val
+    # Color band: 0=green (<=0.4), 1=yellow (<=0.7), 2=red
+    band_colors = (Colors.BRIGHT_GREEN, Colors.BRIGHT_YELLOW, Colors.BRIGHT_RED)
+    parts = []
+    append = parts.append
+    current_color = None
 
+    for i in range(past):
         idx = int(i * step) if step > 1 else i
-        if idx < len(values):
-            normalized = (values[idx] - min_val) / (max_val - min_val)
-            char_idx = min(len(chars) - 1, int(normalized * len(chars)))
-
-            # Color based on value
-            if normalized > 0.7:
-                color = Colors.BRIGHT_RED
-            elif normalized > 0.4:
-                color = Colors.BRIGHT_YELLOW
-            else:
-                color = Colors.BRIGHT_GREEN
-
-            sparkline += color + chars[char_idx] + Colors.RESET
-
-    return sparkline
+        if idx < n_values:
+            normalized = (values[idx] - min_val) / span
+            char_idx = min(7, int(normalized * 8))
+            color = band_colors[2 if normalized > 0.7 else 1 if normalized > 0.4 else 0]
+            if color != current_color:
+                append(color)
+                current_color = color
+            append(chars[char_idx])
+
+    parts.extend(future_run)
+    append(reset)
+    return "".join(parts)
 
 # REMOVED: get_all_messages() - unused function (replaced by load_all_messages_chronologically)
 
@@ -637,58 +732,44 @@ def get_real_time_burn_data(session_id=None):
         if not transcript_file:
             return []
         
-        now = datetime.now()
-        thirty_min_ago = now - timedelta(minutes=30)
+        # エポック秒で比較・バケット化（datetime/timedelta 演算を排除）
+        thirty_min_ago = time.time() - 30 * 60
         
-        # Read messages from transcript
-        messages_with_time = []
+        # Read messages and bucket per minute in one pass (no list, no sort)
+        burn_rates = [0] * 30
+        has_recent = False
         
-        with open(transcript_file, 'r') as f:
+        with open(transcript_file, 'rb', buffering=JSONL_READ_BUFFER) as f:
             for line in f:
                 try:
-                    entry = json.loads(line.strip())
+                    entry = json.loads(line)
                     timestamp_str = entry.get('timestamp')
                     if not timestamp_str:
                         continue
                     
-                    # Parse timestamp and convert to local time
-                    msg_time = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-                    msg_time = msg_time.astimezone().replace(tzinfo=None)  # Convert to local time
+                    # Parse timestamp (tz-aware) to epoch seconds
+                    msg_time = _parse_ts(timestamp_str).timestamp()
                     
                     # Only consider messages from last 30 minutes
-                    if msg_time >= thirty_min_ago:
-                        messages_with_time.append((msg_time, entry))
+                    if msg_time < thirty_min_ago:
+                        continue
+                    has_recent = True
+                    minute = int((msg_time - thirty_min_ago) // 60)
+                    if minute >= 30:
+                        continue
+                    # Check for token usage in assistant messages
+                    if entry.get('type') == 'assistant':
+                        message = entry.get('message')
+                        usage = message.get('usage') if message else None
+                        if usage:
+                            burn_rates[minute] += get_total_tokens(usage)
                         
                 except (json.JSONDecodeError, ValueError):
                     continue
         
-        if not messages_with_time:
+        if not has_recent:
             return []
         
-        # Sort by time
-        messages_with_time.sort(key=lambda x: x[0])
-        
-        # Calculate burn rates per minute
-        burn_rates = []
-        
-        for minute in range(30):
-            # Define 1-minute interval
-            interval_start = thirty_min_ago + timedelta(minutes=minute)
-            interval_end = interval_start + timedelta(minutes=1)
-            
-            # Count tokens in this interval
-            interval_tokens = 0
-            
-            for msg_time, msg in messages_with_time:
-                if interval_start <= msg_time < interval_end:
-                    # Check for token usage in assistant messages
-                    if msg.get('type') == 'assistant' and msg.get('message', {}).get('usage'):
-                        usage = msg['message']['usage']
-                        interval_tokens += get_total_tokens(usage)
-            
-            # Burn rate = tokens per minute
-            burn_rates.append(interval_tokens)
-        
         return burn_rates
     
     except Exception:
@@ -716,18 +797,45 @@ def calculate_tokens_from_transcript(file_path):
     total_output_tokens = 0
     total_cache_creation = 0
     total_cache_read = 0
+    last_usage = None  # 最後の有効な usage（値の取り出しはループ後に1回だけ）
+
+    # transcript は追記のみ: 前回の集計状態が使えれば続きのバイトだけ読む
+    offset = 0
+    resume = _load_transcript_resume_state(file_path)
+    if resume:
+        offset = resume['file_offset']
+        (message_count, error_count, user_messages, assistant_messages,
+         total_input_tokens, total_output_tokens, total_cache_creation, total_cache_read) = (
+            resume['message_count'], resume['error_count'], resume['user_messages'],
+            resume['assistant_messages'], resume['input_tokens'], resume['output_tokens'],
+            resume['cache_creation'], resume['cache_read'])
 
     try:
-        with open(file_path, 'r') as f:
+        with open(file_path, 'rb', buffering=JSONL_READ_BUFFER) as f:
+            if offset:
+                f.seek(offset)
             for line in f:
+                if not line.endswith(b'\n'):
+                    # 改行なしの最終行は書き込み途中かもしれない: 完全な JSON の時だけ消費
+                    try:
+                        json.loads(line)
+                    except ValueError:
+                        break
+                offset += len(line)
+                # 高速プレフィルタ: user/assistant/APIエラー以外の行（summary, progress,
+                # file-history-snapshot 等）は JSON パースせずにスキップ
+                if (b'"assistant"' not in line and b'"user"' not in line
+                        and b'isApiErrorMessage' not in line):
+                    continue
                 try:
-                    entry = json.loads(line.strip())
+                    entry = json.loads(line)
                     
                     # Count message types
-                    if entry.get('type') == 'user':
+                    entry_type = entry.get('type')
+                    if entry_type == 'user':
                         user_messages += 1
                         message_count += 1
-                    elif entry.get('type') == 'assistant':
+                    elif entry_type == 'assistant':
                         assistant_messages += 1
                         message_count += 1
                     
@@ -738,41 +846,35 @@ def calculate_tokens_from_transcript(file_path):
                         error_count += 1
                     
                     # 最後の有効なassistantメッセージのusageを使用（累積値）
-                    if entry.get('type') == 'assistant' and entry.get('message', {}).get('usage'):
-                        usage = entry['message']['usage']
+                    message = entry.get('message') if entry_type == 'assistant' else None
+                    usage = message.get('usage') if message else None
+                    if usage:
                         # 0でないusageのみ更新（エラーメッセージのusage=0を無視）
-                        total_tokens_in_usage = (usage.get('input_tokens', 0) + 
-                                               usage.get('output_tokens', 0) + 
-                                               usage.get('cache_creation_input_tokens', 0) + 
-                                               usage.get('cache_read_input_tokens', 0))
-                        if total_tokens_in_usage > 0:
-                            total_input_tokens = usage.get('input_tokens', 0)
-                            total_output_tokens = usage.get('output_tokens', 0)
-                            total_cache_creation = usage.get('cache_creation_input_tokens', 0)
-                            total_cache_read = usage.get('cache_read_input_tokens', 0)
+                        if (usage.get('input_tokens', 0) or usage.get('output_tokens', 0)
+                                or usage.get('cache_creation_input_tokens', 0)
+                                or usage.get('cache_read_input_tokens', 0)):
+                            last_usage = usage
                         
-                except json.JSONDecodeError:
+                except (json.JSONDecodeError, ValueError):  # ValueError: 不正な UTF-8
                     continue
+        if last_usage is not None:
+            total_input_tokens = last_usage.get('input_tokens', 0)
+            total_output_tokens = last_usage.get('output_tokens', 0)
+            total_cache_creation = last_usage.get('cache_creation_input_tokens', 0)
+            total_cache_read = last_usage.get('cache_read_input_tokens', 0)
     except FileNotFoundError:
         return 0, 0, 0, 0, 0, 0, 0, 0, 0
     except Exception as e:
         # Log error for debugging
-        with open(Path.home() / '.claude' / 'statusline-error.log', 'a') as f:
-            f.write(f"\n{datetime.now()}: Error in calculate_tokens_from_transcript: {e}\n")
-            f.write(f"File path: {file_path}\n")
+        _log_error(f"Error in calculate_tokens_from_transcript: {e}\nFile path: {file_path}\n")
         return 0, 0, 0, 0, 0, 0, 0, 0, 0
     
     # 総トークン数（professional calculation）
-    total_tokens = get_total_tokens({
-        'input_tokens': total_input_tokens,
-        'output_tokens': total_output_tokens,
-        'cache_creation_input_tokens': total_cache_creation,
-        'cache_read_input_tokens': total_cache_read
-    })
+    total_tokens = total_input_tokens + total_output_tokens + total_cache_creation + total_cache_read
 
     result = (total_tokens, message_count, error_count, user_messages, assistant_messages,
               total_input_tokens, total_output_tokens, total_cache_creation, total_cache_read)
-    _save_transcript_stats_cache(file_path, result)
+    _save_transcript_stats_cache(file_path, result, offset)
     return result
 
 def find_session_transcript(session_id):
@@ -781,15 +883,18 @@ def find_session_transcript(session_id):
         return None
     
     projects_dir = Path.home() / '.claude' / 'projects'
+    file_name = f"{session_id}.jsonl"
     
-    if not projects_dir.exists():
-        return None
-    
-    for project_dir in projects_dir.iterdir():
-        if project_dir.is_dir():
-            transcript_file = project_dir / f"{session_id}.jsonl"
-            if transcript_file.exists():
-                return transcript_file
+    # os.scandir: DirEntry の種別キャッシュで Path オブジェクト生成と stat を減らす
+    try:
+        with os.scandir(projects_dir) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    candidate = os.path.join(entry.path, file_name)
+                    if os.path.isfile(candidate):
+                        return Path(candidate)
+    except OSError:
+        pass
     
     return None
 
@@ -808,61 +913,167 @@ def find_all_transcript_files(hours_limit=6):
     transcript_files = []
     cutoff_time = time.time() - (hours_limit * 3600) if hours_limit else 0
 
-    for project_dir in projects_dir.iterdir():
-        if project_dir.is_dir():
-            for file_path in project_dir.glob("*.jsonl"):
-                # Only include files modified within the time limit
-                if hours_limit is None or file_path.stat().st_mtime >= cutoff_time:
-                    transcript_files.append(file_path)
+    # os.scandir: DirEntry が種別・stat をキャッシュするので iterdir()+glob()+stat() より軽い
+    try:
+        project_entries = list(os.scandir(projects_dir))
+    except OSError:
+        return []
+    for project_entry in project_entries:
+        try:
+            if not project_entry.is_dir():
+                continue
+            with os.scandir(project_entry.path) as entries:
+                for entry in entries:
+                    if not entry.name.endswith('.jsonl') or not entry.is_file():
+                        continue
+                    # Only include files modified within the time limit
+                    if hours_limit is None or entry.stat().st_mtime >= cutoff_time:
+                        transcript_files.append(Path(entry.path))
+        except OSError:
+            continue
 
     return transcript_files
 
-def load_all_messages_chronologically(hours_limit=6, transcript_files=None):
+def load_all_messages_chronologically(hours_limit=6, transcript_files=None, since=None):
     """Load messages from recently updated transcripts in chronological order
 
     Args:
         hours_limit: Only load from files modified within this many hours (default: 6)
         transcript_files: Pre-found file list to skip redundant find_all_transcript_files()
+        since: Optional UTC datetime (naive=UTC). Files last modified before it are
+               skipped without opening, and older entries are dropped before building dicts
     """
-    all_messages = []
+    per_file_messages = []
     if transcript_files is None:
         transcript_files = find_all_transcript_files(hours_limit=hours_limit)
 
+    since_utc = None
+    since_ts = None
+    offset_index = None
+    new_offset_index = {}
+    if since is not None:
+        since_utc = since if since.tzinfo else since.replace(tzinfo=timezone.utc)
+        since_ts = since_utc.timestamp()
+        offset_index = _load_transcript_offset_index()
+
     for transcript_file in transcript_files:
         try:
-            with open(transcript_file, 'r') as f:
+            if since_ts is not None:
+                st = os.stat(transcript_file)
+                if st.st_mtime < since_ts:
+                    continue
+            file_messages = []
+            append = file_messages.append  # 行ごとのホットループなので属性参照を外に出す
+            with open(transcript_file, 'rb', buffering=JSONL_READ_BUFFER) as f:
+                # 前回までに「since より古い行しかない」と分かった先頭部分は読み飛ばす。
+                # since は単調に進むので、前回の since 以降なら同じ offset から読めば十分
+                # (ファイルは追記のみ。inode 変化・縮小時は先頭から)
+                skip_to = 0
+                if since_ts is not None:
+                    key = str(transcript_file)
+                    prev = offset_index.get(key)
+                    if (isinstance(prev, list) and len(prev) == 3 and prev[0] == st.st_ino
+                            and prev[1] <= since_ts and prev[2] <= st.st_size):
+                        skip_to = prev[2]
+                        f.seek(skip_to)
+                    # 先頭から連続して捨てた完結行の終端 = 次回の開始位置
+                    pos = skip_to
+                    skipping = True
                 for line in f:
+                    if since_ts is not None and skipping:
+                        if line[-1:] != b'\n':
+                            skipping = False  # 書きかけの行はまだ確定させない
+                        else:
+                            pos += len(line)
                     try:
-                        entry = json.loads(line.strip())
+                        entry = json.loads(line)
                         if entry.get('timestamp'):
                             # UTC タイムスタンプをローカルタイムゾーンに変換、但しUTCも保持
-                            timestamp_utc = datetime.fromisoformat(entry['timestamp'].replace('Z', '+00:00'))
-                            timestamp_local = timestamp_utc.astimezone()
+                            parsed = _parse_ts(entry['timestamp'])
+                            if since_utc is not None and (
+                                    parsed if parsed.tzinfo
+                                    else parsed.replace(tzinfo=timezone.utc)) < since_utc:
+                                continue
+                            if since_ts is not None and skipping:
+                                # この行は残すので、次回はこの行の先頭から読む
+                                skipping = False
+                                pos -= len(line)
+                            timestamp_local = parsed.astimezone()
+                            # 'Z' 付きは tzinfo を外すだけ。文字列を再パースしない
+                            if parsed.tzinfo is timezone.utc:
+                                naive_utc = parsed.replace(tzinfo=None)
+                            else:
+                                naive_utc = _to_naive_utc(parsed)
+                            message = entry.get('message')
                             
-                            all_messages.append({
+                            # 1 メッセージ 1 dict なので、どこからも読まれないキー
+                            # (file_path) は持たない。naive UTC はブロック検出で
+                            # 毎回 astimezone() しないよう、パース時に一度だけ作る
+                            append({
                                 'timestamp': timestamp_local,
-                                'timestamp_utc': timestamp_utc,  # compatibility
+                                'timestamp_utc': naive_utc,
                                 'session_id': entry.get('sessionId'),
                                 'type': entry.get('type'),
-                                'usage': entry.get('message', {}).get('usage') if entry.get('message') else entry.get('usage'),
-                                'model': entry.get('message', {}).get('model') if entry.get('message') else None,
+                                'usage': message.get('usage') if message else entry.get('usage'),
+                                'model': message.get('model') if message else None,
                                 'uuid': entry.get('uuid'),  # For deduplication (fallback)
                                 # One API response spans multiple JSONL lines (one per
                                 # content block), each repeating the same usage under a
                                 # distinct uuid — message.id is the real dedup key
-                                'message_id': entry.get('message', {}).get('id') if entry.get('message') else None,
+                                'message_id': message.get('id') if message else None,
                                 'requestId': entry.get('requestId'),  # For deduplication
-                                'file_path': transcript_file
                             })
                     except (json.JSONDecodeError, ValueError):
                         continue
+            if since_ts is not None:
+                new_offset_index[key] = [st.st_ino, since_ts, pos]
         except (FileNotFoundError, PermissionError):
             continue
-    
-    # 時系列でソート
-    all_messages.sort(key=lambda x: x['timestamp'])
+        if file_messages:
+            # 各ファイルは追記順=ほぼ時系列なので、このソートはほぼ O(n)
+            file_messages.sort(key=_message_timestamp)
+            per_file_messages.append(file_messages)
+
+    if since_ts is not None and new_offset_index != offset_index:
+        _save_transcript_offset_index(new_offset_index)
+
+    # 時系列でソート: ファイルごとのソート済み列を K-way マージ (O(M log K))
+    if len(per_file_messages) == 1:
+        return per_file_messages[0]
+    return list(heapq.merge(*per_file_messages, key=_message_timestamp))
+
+def _get_transcript_offset_index_file():
+    """Get transcript offset index file path (lazy initialization)"""
+    global TRANSCRIPT_OFFSET_INDEX_FILE
+    if TRANSCRIPT_OFFSET_INDEX_FILE is None:
+        TRANSCRIPT_OFFSET_INDEX_FILE = Path.home() / '.claude' / '.transcript_offset_index.json'
+    return TRANSCRIPT_OFFSET_INDEX_FILE
+
+def _load_transcript_offset_index():
+    """{path: [inode, since_epoch, offset]} — offset より前は since_epoch より古い行だけ"""
+    try:
+        with open(_get_transcript_offset_index_file(), 'r') as f:
+            index = json.load(f)
+        if isinstance(index, dict):
+            return index
+    except (json.JSONDecodeError, OSError):
+        pass
+    return {}
 
-    return all_messages
+def _save_transcript_offset_index(index):
+    """Write the offset index atomically (only files read in this call are kept)."""
+    index_file = _get_transcript_offset_index_file()
+    try:
+        tmp = index_file.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(index, f)
+        tmp.rename(index_file)
+    except OSError:
+        pass
+
+def _message_timestamp(msg):
+    """Sort key for message dicts"""
+    return msg['timestamp']
 
 def detect_five_hour_blocks(all_messages, block_duration_hours=5):
     """🕐 SESSION WINDOW: Detect usage periods
@@ -883,76 +1094,78 @@ def detect_five_hour_blocks(all_messages, block_duration_hours=5):
         return []
     
     # Step 1: Sort ALL entries by timestamp
-    sorted_messages = sorted(all_messages, key=lambda x: x['timestamp'])
+    # load_all_messages_chronologically() の K-way マージ結果は整列済みなので
+    # Timsort は 1 回の線形走査で終わる（他の呼び出し元向けに安全策として残す）
+    sorted_messages = sorted(all_messages, key=_message_timestamp)
     
     # Step 1.5: Filter to recent messages only (for accurate block detection)
     # Only consider messages from the last 6 hours to improve accuracy
+    # タイムスタンプは1メッセージにつき1回だけ naive UTC に正規化し、
+    # ソート済みなので cutoff 位置は bisect で求める
     now = datetime.now(timezone.utc).replace(tzinfo=None)
     cutoff_time = now - timedelta(hours=6)  # Last 6 hours only
-    
-    recent_messages = []
-    for msg in sorted_messages:
-        msg_time = msg['timestamp']
-        if hasattr(msg_time, 'tzinfo') and msg_time.tzinfo:
-            msg_time = msg_time.astimezone(timezone.utc).replace(tzinfo=None)
-        
-        if msg_time >= cutoff_time:
-            recent_messages.append(msg)
-    
+
+    # load_all_messages_chronologically がパース時に作った naive UTC を優先し、
+    # キャッシュ由来など持たないメッセージだけ変換する
+    naive_times = [msg.get('timestamp_utc') or _to_naive_utc(msg['timestamp'])
+                   for msg in sorted_messages]
+    start_idx = bisect.bisect_left(naive_times, cutoff_time)
+
     # Use recent messages instead of all messages
-    sorted_messages = recent_messages
+    sorted_messages = sorted_messages[start_idx:]
+    naive_times = naive_times[start_idx:]
 
     blocks = []
     block_duration_ms = block_duration_hours * 60 * 60 * 1000
     current_block_start = None
-    current_block_entries = []
-    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    block_lo = 0  # 現在のブロックの先頭 index（エントリは append せず close 時にスライス）
+    last_entry_time = None
     
     # Step 2: Process entries in chronological order ()
-    for entry in sorted_messages:
-        entry_time = entry['timestamp']
-        
-        # Ensure all timestamps are timezone-naive for consistent comparison
-        if hasattr(entry_time, 'tzinfo') and entry_time.tzinfo:
-            entry_time = entry_time.astimezone(timezone.utc).replace(tzinfo=None)
-        
+    for i, entry_time in enumerate(naive_times):
         if current_block_start is None:
             # First entry - start a new block (floored to the hour)
             current_block_start = floor_to_hour(entry_time)
-            current_block_entries = [entry]
+            block_lo = i
         else:
             # Check if we need to close current block -  123
             time_since_block_start_ms = (entry_time - current_block_start).total_seconds() * 1000
-            
-            if len(current_block_entries) > 0:
-                last_entry_time = current_block_entries[-1]['timestamp']
-                # Ensure timezone consistency
-                if hasattr(last_entry_time, 'tzinfo') and last_entry_time.tzinfo:
-                    last_entry_time = last_entry_time.astimezone(timezone.utc).replace(tzinfo=None)
-                time_since_last_entry_ms = (entry_time - last_entry_time).total_seconds() * 1000
-            else:
-                time_since_last_entry_ms = 0
+            time_since_last_entry_ms = (entry_time - last_entry_time).total_seconds() * 1000
             
             if time_since_block_start_ms > block_duration_ms or time_since_last_entry_ms > block_duration_ms:
                 # Close current block -  125
-                block = create_session_block(current_block_start, current_block_entries, now, block_duration_ms)
+                block = create_session_block(current_block_start, sorted_messages[block_lo:i], now, block_duration_ms)
                 blocks.append(block)
                 
                 # TODO: Add gap block creation if needed ( 129-134)
                 
                 # Start new block (floored to the hour)
                 current_block_start = floor_to_hour(entry_time)
-                current_block_entries = [entry]
-            else:
-                # Add to current block -  142
-                current_block_entries.append(entry)
+                block_lo = i
+        last_entry_time = entry_time
     
     # Close the last block -  148
-    if current_block_start is not None and len(current_block_entries) > 0:
-        block = create_session_block(current_block_start, current_block_entries, now, block_duration_ms)
+    if current_block_start is not None:
+        block = create_session_block(current_block_start, sorted_messages[block_lo:], now, block_duration_ms)
         blocks.append(block)
     
     return blocks
+
+def _to_naive_utc(timestamp):
+    """tz-aware なら UTC に変換して tzinfo を外す（naive はそのまま UTC とみなす）"""
+    if timestamp.tzinfo is not None:
+        return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+def _parse_ts_naive_utc(ts):
+    """ISO タイムスタンプ文字列を naive UTC datetime に変換
+
+    Claude Code の 'Z' 付き UTC は末尾を落として直接パース（astimezone/replace を通さない）。
+    """
+    if ts[-1:] == 'Z':
+        return datetime.fromisoformat(ts[:-1])
+    return _to_naive_utc(_parse_ts(ts))
+
 def floor_to_hour(timestamp):
     """Floor timestamp to hour boundary.
 
@@ -961,7 +1174,7 @@ def floor_to_hour(timestamp):
     at the exact minute of the first message — that path derives the start from
     five_hour.resets_at - 5h and never calls this."""
     # Convert to UTC if timezone-aware
-    if hasattr(timestamp, 'tzinfo') and timestamp.tzinfo:
+    if timestamp.tzinfo:
         utc_timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
     else:
         utc_timestamp = timestamp
@@ -1000,7 +1213,7 @@ def create_session_block(start_time, entries, now, session_duration_ms):
         'is_active': is_active
     }
 
-def find_current_session_block(blocks, target_session_id):
+def find_current_session_block(blocks, target_session_id, session_index=None):
     """Find the most recent active block containing the target session"""
     now = datetime.now(timezone.utc).replace(tzinfo=None)
     
@@ -1013,7 +1226,10 @@ def find_current_session_block(blocks, target_session_id):
         if block_start <= now <= block_end:
             return block
     
-    # Fallback: Find block containing target session
+    # Fallback: Find the most recent block containing target session
+    # 呼び出し側が作った index があれば引くだけ。なければ新しい順に走査して早期終了
+    if session_index is not None:
+        return session_index.get(target_session_id)
     for block in reversed(blocks):
         for message in block['messages']:
             msg_session_id = message.get('session_id') or message.get('sessionId')
@@ -1022,6 +1238,15 @@ def find_current_session_block(blocks, target_session_id):
     
     return None
 
+def _index_blocks_by_session(blocks):
+    """Build {session_id: most recent block containing it} in one pass"""
+    index = {}
+    for block in blocks:  # 古い順に上書き → 最新ブロックが残る
+        for message in block['messages']:
+            index[message.get('session_id') or message.get('sessionId')] = block
+    index.pop(None, None)
+    return index
+
 def calculate_block_statistics_with_deduplication(block, session_id):
     """Calculate comprehensive statistics for a 5-hour block with proper deduplication"""
     if not block:
@@ -1047,10 +1272,9 @@ def calculate_block_statistics_from_messages(block):
     processed_hashes = set()
     processed_session_messages = set()  # Additional session-level dedup
     skipped_duplicates = 0
-    debug_samples = []
     
     # Process ALL messages in the block (from all projects) with enhanced deduplication
-    for i, message in enumerate(block['messages']):
+    for message in block['messages']:
         if message.get('type') == 'assistant' and message.get('usage'):
             # Primary deduplication: message.id + requestId (entry uuid differs
             # per content-block line of the same response — fallback only)
@@ -1060,11 +1284,12 @@ def calculate_block_statistics_from_messages(block):
 
             unique_hash = None
             if message_id and request_id:
-                unique_hash = f"{message_id}:{request_id}"
+                unique_hash = (message_id, request_id)
             
             # Enhanced deduplication: Also check session+timestamp to catch cumulative duplicates
             timestamp = message.get('timestamp')
-            session_message_key = f"{session_id}:{timestamp}" if session_id and timestamp else None
+            # タプルキー: datetime を毎回文字列化しない
+            session_message_key = (session_id, timestamp) if session_id and timestamp else None
             
             skip_message = False
             if unique_hash and unique_hash in processed_hashes:
@@ -1112,17 +1337,6 @@ def calculate_block_statistics_from_messages(block):
             total_output_tokens += output_tokens
             total_cache_creation += cache_creation
             total_cache_read += cache_read
-            
-            # Debug samples  
-            if len(debug_samples) < 3:
-                debug_samples.append({
-                    'idx': i,
-                    'session_id': session_id,
-                    'input': input_tokens,
-                    'cache_creation': cache_creation,
-                    'cache_read': cache_read,
-                    'total': input_tokens + output_tokens + cache_creation + cache_read
-                })
     
     # Final calculation - use actual accumulated values
     total_tokens = total_input_tokens + total_output_tokens + total_cache_creation + total_cache_read
@@ -1142,7 +1356,7 @@ def calculate_tokens_from_jsonl_with_dedup(transcript_file, block_start_time, du
     """Calculate tokens with proper deduplication from JSONL file"""
     try:
         import json
-        from datetime import datetime, timezone
+        from datetime import timezone
         
         # 時間範囲を計算
         if hasattr(block_start_time, 'tzinfo') and block_start_time.tzinfo:
@@ -1164,10 +1378,10 @@ def calculate_tokens_from_jsonl_with_dedup(transcript_file, block_start_time, du
         total_messages = 0
         skipped_duplicates = 0
         
-        with open(transcript_file, 'r') as f:
+        with open(transcript_file, 'rb', buffering=JSONL_READ_BUFFER) as f:
             for line in f:
                 try:
-                    message_data = json.loads(line.strip())
+                    message_data = json.loads(line)
                     if not message_data:
                         continue
                     
@@ -1176,11 +1390,7 @@ def calculate_tokens_from_jsonl_with_dedup(transcript_file, block_start_time, du
                     if not timestamp_str:
                         continue
                     
-                    msg_time = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-                    if msg_time.tzinfo:
-                        msg_time_utc = msg_time.astimezone(timezone.utc).replace(tzinfo=None)
-                    else:
-                        msg_time_utc = msg_time
+                    msg_time_utc = _parse_ts_naive_utc(timestamp_str)
                     
                     # 5時間ウィンドウ内チェック
                     if not (block_start_utc <= msg_time_utc <= block_end_time):
@@ -1190,12 +1400,13 @@ def calculate_tokens_from_jsonl_with_dedup(transcript_file, block_start_time, du
                     
                     # Deduplication by message.id + requestId (entry uuid differs per
                     # content-block line of the same response — fallback only)
-                    message_id = (message_data.get('message') or {}).get('id') or message_data.get('uuid')
+                    message = message_data.get('message')
+                    message_id = (message.get('id') if message else None) or message_data.get('uuid')
                     request_id = message_data.get('requestId')
 
                     unique_hash = None
                     if message_id and request_id:
-                        unique_hash = f"{message_id}:{request_id}"
+                        unique_hash = (message_id, request_id)
 
                     if unique_hash:
                         if unique_hash in processed_hashes:
@@ -1216,7 +1427,7 @@ def calculate_tokens_from_jsonl_with_dedup(transcript_file, block_start_time, du
                     usage = None
                     if msg_type == 'assistant':
                         # usageは最上位またはmessage.usageにある
-                        usage = message_data.get('usage') or message_data.get('message', {}).get('usage')
+                        usage = message_data.get('usage') or (message.get('usage') if message else None)
                     
                     if usage:
                         total_input_tokens += usage.get('input_tokens', 0)
@@ -1227,12 +1438,7 @@ def calculate_tokens_from_jsonl_with_dedup(transcript_file, block_start_time, du
                 except (json.JSONDecodeError, ValueError, TypeError):
                     continue
         
-        total_tokens = get_total_tokens({
-            'input_tokens': total_input_tokens,
-            'output_tokens': total_output_tokens,
-            'cache_creation_input_tokens': total_cache_creation,
-            'cache_read_input_tokens': total_cache_read
-        })
+        total_tokens = total_input_tokens + total_output_tokens + total_cache_creation + total_cache_read
         
         # 重複除去の統計（本番では無効化可能）
         # dedup_rate = (skipped_duplicates / total_messages) * 100 if total_messages > 0 else 0
@@ -1263,16 +1469,17 @@ def generate_burn_timeline_from_jsonl(transcript_file, block_start_utc, duration
     """Generate 15-minute interval burn timeline from JSONL file"""
     try:
         import json
-        from datetime import datetime, timezone
         
         timeline = [0] * 20  # 20 segments (5 hours / 15 minutes each)
         block_end_time = block_start_utc + timedelta(seconds=duration_seconds)
         processed_hashes = set()
 
-        with open(transcript_file, 'r') as f:
+        with open(transcript_file, 'rb', buffering=JSONL_READ_BUFFER) as f:
             for line in f:
+                if b'"usage"' not in line:  # usage なしの行は JSON パース不要
+                    continue
                 try:
-                    message_data = json.loads(line.strip())
+                    message_data = json.loads(line)
                     if not message_data or message_data.get('type') != 'assistant':
                         continue
 
@@ -1281,27 +1488,24 @@ def generate_burn_timeline_from_jsonl(transcript_file, block_start_utc, duration
                     if not timestamp_str:
                         continue
 
-                    msg_time = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-                    if msg_time.tzinfo:
-                        msg_time_utc = msg_time.astimezone(timezone.utc).replace(tzinfo=None)
-                    else:
-                        msg_time_utc = msg_time
+                    msg_time_utc = _parse_ts_naive_utc(timestamp_str)
 
                     # Check if within 5-hour window
                     if not (block_start_utc <= msg_time_utc <= block_end_time):
                         continue
 
                     # Get usage data
-                    usage = message_data.get('usage') or message_data.get('message', {}).get('usage')
+                    message = message_data.get('message')
+                    usage = message_data.get('usage') or (message.get('usage') if message else None)
                     if not usage:
                         continue
 
                     # One response spans multiple JSONL lines repeating the same
                     # usage — count each message.id:requestId once
-                    message_id = (message_data.get('message') or {}).get('id') or message_data.get('uuid')
+                    message_id = (message.get('id') if message else None) or message_data.get('uuid')
                     request_id = message_data.get('requestId')
                     if message_id and request_id:
-                        unique_hash = f"{message_id}:{request_id}"
+                        unique_hash = (message_id, request_id)
                         if unique_hash in processed_hashes:
                             continue
                         processed_hashes.add(unique_hash)
@@ -1342,7 +1546,7 @@ def calculate_block_statistics_fallback(block):
     user_messages = 0
     assistant_messages = 0
     error_count = 0
-    processed_hashes = set()  # 重複除去用（messageId:requestId）
+    processed_hashes = set()  # 重複除去用（(messageId, requestId) タプル）
     total_messages = 0
     skipped_duplicates = 0
     
@@ -1362,7 +1566,7 @@ def calculate_block_statistics_fallback(block):
 
         unique_hash = None
         if message_id and request_id:
-            unique_hash = f"{message_id}:{request_id}"
+            unique_hash = (message_id, request_id)
 
         if unique_hash:
             if unique_hash in processed_hashes:
@@ -1371,26 +1575,23 @@ def calculate_block_statistics_fallback(block):
             processed_hashes.add(unique_hash)
 
         # メッセージ種別のカウント
-        if message_data['type'] == 'user':
+        message_type = message_data['type']
+        if message_type == 'user':
             user_messages += 1
-        elif message_data['type'] == 'assistant':
+        elif message_type == 'assistant':
             assistant_messages += 1
         if message_data.get('isApiErrorMessage'):
             error_count += 1
         
         # トークン使用量の合計（assistantメッセージのusageのみ - 外部ツール互換）
-        if message_data['type'] == 'assistant' and message_data.get('usage'):
-            total_input_tokens += message_data['usage'].get('input_tokens', 0)
-            total_output_tokens += message_data['usage'].get('output_tokens', 0)
-            total_cache_creation += message_data['usage'].get('cache_creation_input_tokens', 0)
-            total_cache_read += message_data['usage'].get('cache_read_input_tokens', 0)
+        usage = message_data.get('usage') if message_type == 'assistant' else None
+        if usage:
+            total_input_tokens += usage.get('input_tokens', 0)
+            total_output_tokens += usage.get('output_tokens', 0)
+            total_cache_creation += usage.get('cache_creation_input_tokens', 0)
+            total_cache_read += usage.get('cache_read_input_tokens', 0)
     
-    total_tokens = get_total_tokens({
-        'input_tokens': total_input_tokens,
-        'output_tokens': total_output_tokens,
-        'cache_creation_input_tokens': total_cache_creation,
-        'cache_read_input_tokens': total_cache_read
-    })
+    total_tokens = total_input_tokens + total_output_tokens + total_cache_creation + total_cache_read
     
     # アクティブ期間の検出（ブロック内）
     active_periods = detect_active_periods(block['messages'])
@@ -1399,13 +1600,6 @@ def calculate_block_statistics_fallback(block):
     # Use duration already calculated in create_session_block
     actual_duration = block['duration_seconds']
     
-    # Use duration already calculated in create_session_block
-    actual_duration = block['duration_seconds']
-    
-    # アクティブ期間の検出（ブロック内）
-    active_periods = detect_active_periods(block['messages'])
-    total_active_duration = sum((end - start).total_seconds() for start, end in active_periods)
-    
     # 5時間ブロック内での15分間隔Burnデータを生成（20セグメント）- 同じデータソース使用
     burn_timeline = generate_realtime_burn_timeline(block['start_time'], actual_duration)
 
@@ -1497,11 +1691,8 @@ def generate_realtime_burn_timeline(block_start_time, duration_seconds):
     
     
     # 経過したセグメントに活動データを設定（実際の時間ベース）
-    for i in range(completed_segments):
-        # 基本活動量 + ランダムな変動で現実的なパターン
-        base_activity = 1000
-        variation = (i * 47) % 800  # 疑似ランダム変動
-        timeline[i] = base_activity + variation
+    # 基本活動量 1000 + 疑似ランダム変動 (i*47)%800 を 1 回のスライス代入で
+    timeline[:completed_segments] = [1000 + (i * 47) % 800 for i in range(completed_segments)]
     
     return timeline
 
@@ -1531,6 +1722,8 @@ def generate_real_burn_timeline(block_stats, current_block, api_block_start_utc=
             else:
                 block_start_utc = block_start
 
+        # aware 同士の差分は astimezone()+replace() より速いので開始時刻を aware 版でも持つ
+        block_start_aware = block_start_utc.replace(tzinfo=timezone.utc)
         processed_hashes = set()
         for message in current_block['messages']:
             try:
@@ -1542,7 +1735,7 @@ def generate_real_burn_timeline(block_stats, current_block, api_block_start_utc=
                 message_id = message.get('message_id') or message.get('uuid')
                 request_id = message.get('requestId')
                 if message_id and request_id:
-                    unique_hash = f"{message_id}:{request_id}"
+                    unique_hash = (message_id, request_id)
                     if unique_hash in processed_hashes:
                         continue
                     processed_hashes.add(unique_hash)
@@ -1551,12 +1744,10 @@ def generate_real_burn_timeline(block_stats, current_block, api_block_start_utc=
                 if not msg_time:
                     continue
 
-                if hasattr(msg_time, 'tzinfo') and msg_time.tzinfo:
-                    msg_time_utc = msg_time.astimezone(timezone.utc).replace(tzinfo=None)
+                if msg_time.tzinfo:
+                    elapsed_minutes = (msg_time - block_start_aware).total_seconds() / 60
                 else:
-                    msg_time_utc = msg_time
-
-                elapsed_minutes = (msg_time_utc - block_start_utc).total_seconds() / 60
+                    elapsed_minutes = (msg_time - block_start_utc).total_seconds() / 60
                 if elapsed_minutes < 0 or elapsed_minutes >= 300:  # 5h = 300min
                     continue
 
@@ -1575,44 +1766,116 @@ def generate_real_burn_timeline(block_stats, current_block, api_block_start_utc=
 def get_git_info(directory):
     """Get git branch and status"""
     try:
-        git_dir = Path(directory) / '.git'
-        if not git_dir.exists():
+        # 毎レンダー呼ばれるので Path オブジェクトは作らず os.path で済ませる
+        git_dir = os.path.join(directory, '.git')
+        if not os.path.exists(git_dir):
             return None, 0, 0
         
         # Get branch
         branch = None
-        head_file = git_dir / 'HEAD'
-        if head_file.exists():
-            with open(head_file, 'r') as f:
+        try:
+            with open(os.path.join(git_dir, 'HEAD'), 'r') as f:
                 head = f.read().strip()
                 if head.startswith('ref: refs/heads/'):
                     branch = head.replace('ref: refs/heads/', '')
+        except OSError:
+            pass
         
+        # HEAD/index の mtime が変わっておらず TTL 内ならキャッシュを使う（fork/exec 回避）
+        state = _get_git_state_key(git_dir)
+        cached = _load_git_status_cache(directory, state)
+        if cached is not None:
+            return branch, cached[0], cached[1]
+
         # Get detailed status
         try:
             # Check for uncommitted changes
+            # --no-optional-locks: status が .git/index を書き換えない（ロック競合・mtime 変化を防ぐ）
             result = subprocess.run(
-                ['git', 'status', '--porcelain'],
+                ['git', '--no-optional-locks', 'status', '--porcelain'],
                 cwd=directory,
                 capture_output=True,
                 text=True,
                 timeout=1
             )
             
-            changes = result.stdout.strip().split('\n') if result.stdout.strip() else []
-            modified = len([c for c in changes if c.startswith(' M') or c.startswith('M')])
-            added = len([c for c in changes if c.startswith('??')])
+            # 1パスで集計（中間リストを作らない）
+            modified = 0
+            added = 0
+            for line in result.stdout.splitlines():
+                if line.startswith((' M', 'M')):
+                    modified += 1
+                elif line.startswith('??'):
+                    added += 1
             
+            _save_git_status_cache(directory, state, modified, added)
             return branch, modified, added
-        except:
+        except (subprocess.SubprocessError, OSError):
             return branch, 0, 0
             
     except Exception:
         return None, 0, 0
 
-def get_time_info():
-    """Get current time"""
-    now = datetime.now()
+def _get_git_status_cache_file():
+    """Get git status cache file path (lazy initialization)"""
+    global GIT_STATUS_CACHE_FILE
+    if GIT_STATUS_CACHE_FILE is None:
+        GIT_STATUS_CACHE_FILE = Path.home() / '.claude' / '.git_status_cache.json'
+    return GIT_STATUS_CACHE_FILE
+
+def _get_git_state_key(git_dir):
+    """[HEAD mtime_ns, index mtime_ns] — commit/stage/branch 切替で変化する"""
+    key = []
+    for name in ('HEAD', 'index'):
+        try:
+            key.append(os.stat(os.path.join(git_dir, name)).st_mtime_ns)
+        except OSError:
+            key.append(0)
+    return key
+
+def _load_git_status_cache(directory, state):
+    """Return cached (modified, untracked) if TTL + state match, else None."""
+    try:
+        with open(_get_git_status_cache_file(), 'r') as f:
+            entry = json.load(f).get(str(directory))
+        if (entry and entry.get('state') == state
+                and time.time() - entry.get('timestamp', 0) < GIT_STATUS_CACHE_TTL):
+            return entry['modified'], entry['untracked']
+    except (json.JSONDecodeError, OSError, AttributeError, KeyError, TypeError):
+        pass
+    return None
+
+def _save_git_status_cache(directory, state, modified, untracked):
+    """Write git status cache atomically (expired entries of other dirs are dropped)."""
+    cache_file = _get_git_status_cache_file()
+    now = time.time()
+    try:
+        try:
+            with open(cache_file, 'r') as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                data = {}
+        except (json.JSONDecodeError, OSError):
+            data = {}
+        data = {k: v for k, v in data.items()
+                if isinstance(v, dict) and now - v.get('timestamp', 0) < GIT_STATUS_CACHE_TTL}
+        data[str(directory)] = {
+            'timestamp': now,
+            'state': state,
+            'modified': modified,
+            'untracked': untracked,
+        }
+        tmp = cache_file.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        tmp.rename(cache_file)
+    except OSError:
+        pass
+
+def get_time_info(now=None):
+    """Get current time (pass `now` to reuse an already-fetched timestamp)"""
+    if now is None:
+        now = datetime.now()
     return now.strftime("%H:%M")
 
 # ========================================
@@ -1641,7 +1904,7 @@ def parse_event_time(event):
     if 'date' in start:
         # All-day event: parse date only
         date_str = start['date']
-        dt = datetime.strptime(date_str, '%Y-%m-%d')
+        dt = datetime.fromisoformat(date_str)
         # Set to start of day in local timezone
         return dt.replace(hour=0, minute=0, second=0), True
 
@@ -1772,7 +2035,7 @@ def get_next_event():
                 if 'dateTime' in end:
                     end_dt = datetime.fromisoformat(end['dateTime']).astimezone()
                 elif 'date' in end:
-                    end_dt = datetime.strptime(end['date'], '%Y-%m-%d')
+                    end_dt = datetime.fromisoformat(end['date'])
 
                 if end_dt and now > end_dt:
                     # Event has ended, invalidate cache
@@ -1806,7 +2069,7 @@ def get_next_event():
     if 'dateTime' in end:
         end_dt = datetime.fromisoformat(end['dateTime']).astimezone()
     elif 'date' in end:
-        end_dt = datetime.strptime(end['date'], '%Y-%m-%d')
+        end_dt = datetime.fromisoformat(end['date'])
 
     if end_dt and now > end_dt:
         # Event has ended
@@ -1896,12 +2159,17 @@ def detect_active_periods(messages, idle_threshold=5*60):
         return []
     
     active_periods = []
+    append = active_periods.append
     current_start = None
     last_time = None
     
     for msg in messages:
         try:
-            msg_time_utc = datetime.fromisoformat(msg['timestamp'].replace('Z', '+00:00'))
+            # load_all_messages_chronologically() 由来のメッセージは解析済み datetime を
+            # 持っているので再パースしない（生の JSONL エントリのみ文字列をパース）
+            msg_time_utc = msg['timestamp']
+            if isinstance(msg_time_utc, str):
+                msg_time_utc = _parse_ts(msg_time_utc)
             # システムのローカルタイムゾーンに自動変換
             msg_time = msg_time_utc.astimezone()
             
@@ -1915,13 +2183,14 @@ def detect_active_periods(messages, idle_threshold=5*60):
             if time_diff > idle_threshold:
                 # 前のアクティブ期間を終了
                 if current_start and last_time:
-                    active_periods.append((current_start, last_time))
+                    append((current_start, last_time))
                 # 新しいアクティブ期間を開始
                 current_start = msg_time
             
             last_time = msg_time
             
-        except:
+        except (KeyError, TypeError, ValueError, AttributeError):
+            # timestamp 欠落・不正形式・None のメッセージだけをスキップ
             continue
     
     # 最後のアクティブ期間を追加
@@ -1938,50 +2207,42 @@ def detect_active_periods(messages, idle_threshold=5*60):
 
 # REMOVED: get_time_progress_bar() - unused function (replaced by get_progress_bar)
 
-def _resolve_model_rates(model_name="Unknown", model_id=""):
-    """Resolve (input_rate, output_rate) per MTok from Anthropic public pricing.
-
-    Snapshot: Anthropic pricing page (2026). Cache multipliers are applied separately.
-    Match order: longest / newest version first to avoid Sonnet 4 matching "Sonnet 4.6".
-    """
-    haystack = f"{model_name} {model_id}".lower()
-
+# (needles, (input_rate, output_rate)) — 上から順に最初にマッチしたものを採用。
+# Match order: longest / newest version first to avoid Sonnet 4 matching "Sonnet 4.6".
+_MODEL_RATE_TABLE = (
     # --- Fable (new top tier above Opus, 2026) ---
-    if "fable" in haystack:
-        return 10.00, 50.00  # Fable 5
-
+    (("fable",), (10.00, 50.00)),                                   # Fable 5
     # --- Haiku ---
-    if "haiku-4-5" in haystack or "haiku 4.5" in haystack:
-        return 1.00, 5.00     # Haiku 4.5
-    if "haiku-3-5" in haystack or "haiku 3.5" in haystack:
-        return 0.80, 4.00     # Haiku 3.5 (retired except Bedrock/Vertex)
-    if "haiku" in haystack:
-        return 1.00, 5.00     # Generic "Haiku" — default to current 4.5 tier
-
+    (("haiku-4-5", "haiku 4.5"), (1.00, 5.00)),                     # Haiku 4.5
+    (("haiku-3-5", "haiku 3.5"), (0.80, 4.00)),                     # Haiku 3.5 (retired except Bedrock/Vertex)
+    (("haiku",), (1.00, 5.00)),                                     # Generic "Haiku" — default to current 4.5 tier
     # --- Sonnet (4 / 4.5 / 4.6 share the same price) ---
-    if "sonnet" in haystack:
-        return 3.00, 15.00
-
+    (("sonnet",), (3.00, 15.00)),
     # --- Opus 4.5 / 4.6 / 4.7 / 4.8 (new pricing tier) ---
     # NOTE: must be checked before the legacy "opus-4" match below,
     # otherwise e.g. "opus-4-8" would be caught by the "opus-4" substring.
-    if (
-        "opus-4-8" in haystack or "opus 4.8" in haystack
-        or "opus-4-7" in haystack or "opus 4.7" in haystack
-        or "opus-4-6" in haystack or "opus 4.6" in haystack
-        or "opus-4-5" in haystack or "opus 4.5" in haystack
-    ):
-        return 5.00, 25.00
-
+    (("opus-4-8", "opus 4.8", "opus-4-7", "opus 4.7",
+      "opus-4-6", "opus 4.6", "opus-4-5", "opus 4.5"), (5.00, 25.00)),
     # --- Opus 4 / 4.1 (legacy pricing) ---
-    if (
-        "opus-4-1" in haystack or "opus 4.1" in haystack
-        or "opus-4" in haystack or "opus 4" in haystack
-    ):
-        return 15.00, 75.00
+    (("opus-4-1", "opus 4.1", "opus-4", "opus 4"), (15.00, 75.00)),
+)
+# Unknown: default to current Opus tier pricing.
+_DEFAULT_MODEL_RATES = (5.00, 25.00)
+
+@functools.lru_cache(maxsize=64)
+def _resolve_model_rates(model_name="Unknown", model_id=""):
+    """Resolve (input_rate, output_rate) per MTok from Anthropic public pricing.
 
-    # Unknown: default to current Opus tier pricing.
-    return 5.00, 25.00
+    Snapshot: Anthropic pricing page (2026). Cache multipliers are applied separately.
+    Rates live in _MODEL_RATE_TABLE (first match wins). Memoized: transcript scans
+    call this once per message with only a handful of distinct model names.
+    """
+    haystack = f"{model_name} {model_id}".lower()
+    for needles, rates in _MODEL_RATE_TABLE:
+        for needle in needles:
+            if needle in haystack:
+                return rates
+    return _DEFAULT_MODEL_RATES
 
 
 def calculate_cost(input_tokens, output_tokens, cache_creation, cache_read,
@@ -2003,6 +2264,10 @@ def calculate_cost(input_tokens, output_tokens, cache_creation, cache_read,
             and bill 5m/1h separately. When only one is given, the other defaults
             to 0; when both are None, the legacy `cache_creation` path is used.
     """
+    # トークンが全部 0 ならレート解決も計算も不要
+    if not (input_tokens or output_tokens or cache_creation or cache_read
+            or cache_creation_5m or cache_creation_1h):
+        return 0.0
     input_rate, output_rate = _resolve_model_rates(model_name, model_id)
     cache_5m_rate = input_rate * 1.25
     cache_1h_rate = input_rate * 2.00
@@ -2011,16 +2276,14 @@ def calculate_cost(input_tokens, output_tokens, cache_creation, cache_read,
     if cache_creation_5m is not None or cache_creation_1h is not None:
         c5 = cache_creation_5m or 0
         c1 = cache_creation_1h or 0
-        cache_write_cost = (c5 / 1_000_000) * cache_5m_rate + (c1 / 1_000_000) * cache_1h_rate
+        cache_write = c5 * cache_5m_rate + c1 * cache_1h_rate
     else:
         # Legacy: treat all cache creation as 5m writes (matches pre-2026 behavior).
-        cache_write_cost = (cache_creation / 1_000_000) * cache_5m_rate
-
-    input_cost = (input_tokens / 1_000_000) * input_rate
-    output_cost = (output_tokens / 1_000_000) * output_rate
-    cache_read_cost = (cache_read / 1_000_000) * cache_read_rate
+        cache_write = cache_creation * cache_5m_rate
 
-    return input_cost + output_cost + cache_write_cost + cache_read_cost
+    # 1 式にまとめて MTok 換算は最後に 1 回だけ
+    return (input_tokens * input_rate + output_tokens * output_rate
+            + cache_write + cache_read * cache_read_rate) / 1_000_000
 
 def format_cost(cost):
     """Format cost for display"""
@@ -2093,7 +2356,7 @@ def calculate_metered_cost_from_transcript(transcript_path):
                 message_id = message.get('id') or message_data.get('uuid')
                 request_id = message_data.get('requestId')
                 if message_id and request_id:
-                    unique_hash = f"{message_id}:{request_id}"
+                    unique_hash = (message_id, request_id)
                     if unique_hash in processed_hashes:
                         continue
                     processed_hashes.add(unique_hash)
@@ -2181,7 +2444,7 @@ def _metered_cost_from_messages(messages):
         message_id = message.get('message_id') or message.get('uuid')
         request_id = message.get('requestId')
         if message_id and request_id:
-            unique_hash = f"{message_id}:{request_id}"
+            unique_hash = (message_id, request_id)
             if unique_hash in processed_hashes:
                 continue
             processed_hashes.add(unique_hash)
@@ -2192,6 +2455,14 @@ def _metered_cost_from_messages(messages):
 # RESPONSIVE DISPLAY MODE FORMATTERS
 # ========================================
 
+_MODEL_ID_RE = re.compile(r'^claude-([a-z]+)-(\d+(?:-\d+)?)(?:-\d{8})?(?:\[\d+m\])?$', re.IGNORECASE)
+_CLAUDE_PREFIX_RE = re.compile(r'^Claude\s+', re.IGNORECASE)
+_CONTEXT_SUFFIX_RE = re.compile(r'\s*\([\d.]+[kKmM]?\s+context\)')
+_VERSION_FIRST_RE = re.compile(r'^([\d.]+)\s+(Haiku|Sonnet|Opus|Fable)', re.IGNORECASE)
+_TIGHT_FAMILY_RE = re.compile(r'Opus|Sonnet|Haiku|Fable', re.IGNORECASE)
+_TIGHT_FAMILY = {'opus': 'Op', 'sonnet': 'Son', 'haiku': 'Hai', 'fable': 'Fab'}
+
+@functools.lru_cache(maxsize=32)
 def shorten_model_name(model, tight=False):
     """モデル名を短縮形に変換
 
@@ -2199,33 +2470,30 @@ def shorten_model_name(model, tight=False):
     tight=True: ファミリー名も短縮 → "Op4.6"
     display_name に生の model id が来る CC バージョンにも対応
     （"claude-fable-5[1m]" → "Fable 5"）
+    セッション中のモデル名はほぼ一定なので結果を memoize する。
     """
-    import re
     # 生 model id 形式の正規化: "claude-opus-4-7[1m]" → "Opus 4.7", "claude-fable-5" → "Fable 5",
     # "claude-haiku-4-5-20251001" → "Haiku 4.5" (日付 suffix は捨てる)
-    m = re.match(r'^claude-([a-z]+)-(\d+(?:-\d+)?)(?:-\d{8})?(?:\[\d+m\])?$', model, re.IGNORECASE)
+    m = _MODEL_ID_RE.match(model)
     if m:
         family = m.group(1).capitalize()
         version = m.group(2).replace('-', '.')
         model = f"{family} {version}"
 
     # "Claude " プレフィックスを除去
-    name = re.sub(r'^Claude\s+', '', model, flags=re.IGNORECASE)
+    name = _CLAUDE_PREFIX_RE.sub('', model)
 
     # "(1M context)" "(200k context)" などのコンテキストサイズ suffix を除去
-    name = re.sub(r'\s*\([\d.]+[kKmM]?\s+context\)', '', name).strip()
+    name = _CONTEXT_SUFFIX_RE.sub('', name).strip()
 
     # "3.5 Haiku" → "Haiku 3.5" に正規化（バージョンが前にある場合）
-    m = re.match(r'^([\d.]+)\s+(Haiku|Sonnet|Opus|Fable)', name, re.IGNORECASE)
+    m = _VERSION_FIRST_RE.match(name)
     if m:
         name = f"{m.group(2)} {m.group(1)}"
 
     if tight:
-        # ファミリー名を短縮
-        name = re.sub(r'Opus', 'Op', name, flags=re.IGNORECASE)
-        name = re.sub(r'Sonnet', 'Son', name, flags=re.IGNORECASE)
-        name = re.sub(r'Haiku', 'Hai', name, flags=re.IGNORECASE)
-        name = re.sub(r'Fable', 'Fab', name, flags=re.IGNORECASE)
+        # ファミリー名を短縮（1 パスで置換）
+        name = _TIGHT_FAMILY_RE.sub(lambda fm: _TIGHT_FAMILY[fm.group(0).lower()], name)
         # スペース除去 → "Op4.6", "Son4.5", "Hai3.5", "Fab5"
         name = name.replace(' ', '')
 
@@ -2336,7 +2604,7 @@ def build_line1_parts(ctx, max_branch_len=20, max_dir_len=None,
                 pct = int(used_val / limit_val * 100)
                 pct_color = _get_utilization_color(pct)
                 parts.append(
-                    f"{Colors.BRIGHT_YELLOW}Ext{Colors.RESET} {pct_color}{pct}%{Colors.RESET} "
+                    f"{_label('Ext', 'BRIGHT_YELLOW')} {pct_color}{pct}%{Colors.RESET} "
                     f"{Colors.BRIGHT_WHITE}${used_val:.2f}/${limit_val:.0f}{Colors.RESET}"
                 )
 
@@ -2464,14 +2732,14 @@ def format_output_full(ctx, terminal_width=None):
             percentage_display = f"{Colors.BG_RED}{Colors.BRIGHT_WHITE}{Colors.BOLD}[{percentage}%]{Colors.RESET}"
             compact_label = f"{title_color}Context:{Colors.RESET}"
         else:
-            compact_label = f"{Colors.BRIGHT_CYAN}Context:{Colors.RESET}"
+            compact_label = _label('Context:')
             percentage_display = f"{percentage_color}{Colors.BOLD}[{percentage}%]{Colors.RESET}"
 
         line2_parts.append(compact_label)
         line2_parts.append(get_progress_bar(percentage, width=graph_width))
         line2_parts.append(percentage_display)
         denom = ctx['context_size']
-        line2_parts.append(f"{Colors.BRIGHT_WHITE}{compact_display}/{format_token_count(denom)}{Colors.RESET}")
+        line2_parts.append(f"{Colors.BRIGHT_WHITE}{compact_display}/{_format_context_size(denom)}{Colors.RESET}")
 
         if ctx['cache_ratio'] >= 50:
             line2_parts.append(f"{Colors.BRIGHT_GREEN}♻️ {int(ctx['cache_ratio'])}% cached{Colors.RESET}")
@@ -2482,7 +2750,7 @@ def format_output_full(ctx, terminal_width=None):
     if ctx['show_line3']:
         if ctx['session_duration'] or ctx.get('api_session_range'):
             line3_parts = []
-            line3_parts.append(f"{Colors.BRIGHT_CYAN}Session:{Colors.RESET}")
+            line3_parts.append(_label('Session:'))
             # Use burn sparkline instead of progress bar
             if ctx['burn_timeline']:
                 sparkline = create_sparkline(ctx['burn_timeline'], width=graph_width, current_pos=ctx.get('burn_current_pos'), future_style="bar")
@@ -2508,7 +2776,7 @@ def format_output_full(ctx, terminal_width=None):
                 line3_parts.append(f"{Colors.BRIGHT_YELLOW}${block_cost:.0f}{Colors.RESET}")
             lines.append(" ".join(line3_parts))
         else:
-            lines.append(f"{Colors.BRIGHT_CYAN}Session:{Colors.RESET} --")
+            lines.append(f"{_label('Session:')} --")
 
     # Line 4: Weekly usage
     if ctx['show_line4']:
@@ -2525,7 +2793,7 @@ def format_output_full(ctx, terminal_width=None):
             else:
                 lines.append(ctx['weekly_line'])
         else:
-            lines.append(f"{Colors.BRIGHT_CYAN}Weekly: {Colors.RESET} --")
+            lines.append(f"{_label('Weekly: ')} --")
 
     return lines
 
@@ -2584,10 +2852,10 @@ def format_output_compact(ctx):
         percentage = ctx['percentage']
         compact_display = format_token_count_short(ctx['compact_tokens'])
         denom = ctx['context_size']
-        threshold_display = format_token_count_short(denom)
+        threshold_display = _format_context_size(denom, short=True)
         percentage_color = get_percentage_color(percentage)
 
-        line2 = f"{Colors.BRIGHT_CYAN}C:{Colors.RESET} {get_progress_bar(percentage, width=12)} "
+        line2 = f"{_label('C:')} {get_progress_bar(percentage, width=12)} "
         line2 += f"{percentage_color}[{percentage}%]{Colors.RESET} "
         line2 += f"{Colors.BRIGHT_WHITE}{compact_display}/{threshold_display}{Colors.RESET}"
         lines.append(line2)
@@ -2599,9 +2867,9 @@ def format_output_compact(ctx):
             for spark_width in (12, 8):
                 if ctx['burn_timeline']:
                     sparkline = create_sparkline(ctx['burn_timeline'], width=spark_width, current_pos=ctx.get('burn_current_pos'), future_style="bar")
-                    line3 = f"{Colors.BRIGHT_CYAN}S:{Colors.RESET} {sparkline} "
+                    line3 = f"{_label('S:')} {sparkline} "
                 else:
-                    line3 = f"{Colors.BRIGHT_CYAN}S:{Colors.RESET} {get_progress_bar(ctx['block_progress'], width=spark_width)} "
+                    line3 = f"{_label('S:')} {get_progress_bar(ctx['block_progress'], width=spark_width)} "
                 if ctx.get('five_hour_utilization') is not None:
                     util = int(ctx['five_hour_utilization'])
                     util_color = _get_utilization_color(util)
@@ -2616,7 +2884,7 @@ def format_output_compact(ctx):
                     break
             lines.append(line3)
         else:
-            lines.append(f"{Colors.BRIGHT_CYAN}S:{Colors.RESET} --")
+            lines.append(f"{_label('S:')} --")
 
     # Line 4: Weekly (shortened with remaining time)
     if ctx['show_line4']:
@@ -2629,14 +2897,14 @@ def format_output_compact(ctx):
                 wt = ctx.get('weekly_timeline')
                 if wt and any(v > 0 for v in wt):
                     spark = create_sparkline(wt, width=12, current_pos=ctx.get('weekly_current_pos'))
-                    line4 = f"{Colors.BRIGHT_CYAN}W:{Colors.RESET} {spark} {util_color}[{int(util)}%]{Colors.RESET}"
+                    line4 = f"{_label('W:')} {spark} {util_color}[{int(util)}%]{Colors.RESET}"
                 else:
-                    line4 = f"{Colors.BRIGHT_CYAN}W:{Colors.RESET} {get_progress_bar(util, width=12)} {util_color}[{int(util)}%]{Colors.RESET}"
+                    line4 = f"{_label('W:')} {get_progress_bar(util, width=12)} {util_color}[{int(util)}%]{Colors.RESET}"
                 # Add remaining time (e.g. "6d10h07m")
                 resets_at_str = seven_day.get('resets_at')
                 if resets_at_str:
                     try:
-                        resets_at = datetime.fromisoformat(resets_at_str)
+                        resets_at = _parse_ts(resets_at_str)
                         remaining_s = max(0, (resets_at - datetime.now(timezone.utc)).total_seconds())
                         if remaining_s < 3600:
                             line4 += f" {Colors.BRIGHT_WHITE}{int(remaining_s / 60)}m{Colors.RESET}"
@@ -2658,7 +2926,7 @@ def format_output_compact(ctx):
             else:
                 lines.append(ctx['weekly_line'])
         else:
-            lines.append(f"{Colors.BRIGHT_CYAN}W:{Colors.RESET} --")
+            lines.append(f"{_label('W:')} --")
 
     return lines
 
@@ -2713,7 +2981,7 @@ def format_output_tight(ctx):
         compact_display = format_token_count_short(ctx['compact_tokens'])
         percentage_color = get_percentage_color(percentage)
 
-        line2 = f"{Colors.BRIGHT_CYAN}C:{Colors.RESET} {get_progress_bar(percentage, width=8)} "
+        line2 = f"{_label('C:')} {get_progress_bar(percentage, width=8)} "
         line2 += f"{percentage_color}[{percentage}%]{Colors.RESET} {Colors.BRIGHT_WHITE}{compact_display}{Colors.RESET}"
         lines.append(line2)
 
@@ -2724,9 +2992,9 @@ def format_output_tight(ctx):
             for spark_width in (8, 5):
                 if ctx['burn_timeline']:
                     sparkline = create_sparkline(ctx['burn_timeline'], width=spark_width, current_pos=ctx.get('burn_current_pos'), future_style="bar")
-                    line3 = f"{Colors.BRIGHT_CYAN}S:{Colors.RESET} {sparkline} "
+                    line3 = f"{_label('S:')} {sparkline} "
                 else:
-                    line3 = f"{Colors.BRIGHT_CYAN}S:{Colors.RESET} {get_progress_bar(ctx['block_progress'], width=spark_width)} "
+                    line3 = f"{_label('S:')} {get_progress_bar(ctx['block_progress'], width=spark_width)} "
                 if ctx.get('five_hour_utilization') is not None:
                     util = int(ctx['five_hour_utilization'])
                     util_color = _get_utilization_color(util)
@@ -2738,7 +3006,7 @@ def format_output_tight(ctx):
                     break
             lines.append(line3)
         else:
-            lines.append(f"{Colors.BRIGHT_CYAN}S:{Colors.RESET} --")
+            lines.append(f"{_label('S:')} --")
 
     # Line 4: Weekly (ultra short with remaining time)
     if ctx['show_line4']:
@@ -2751,14 +3019,14 @@ def format_output_tight(ctx):
                 wt = ctx.get('weekly_timeline')
                 if wt and any(v > 0 for v in wt):
                     spark = create_sparkline(wt, width=8, current_pos=ctx.get('weekly_current_pos'))
-                    line4 = f"{Colors.BRIGHT_CYAN}W:{Colors.RESET} {spark} {util_color}[{int(util)}%]{Colors.RESET}"
+                    line4 = f"{_label('W:')} {spark} {util_color}[{int(util)}%]{Colors.RESET}"
                 else:
-                    line4 = f"{Colors.BRIGHT_CYAN}W:{Colors.RESET} {get_progress_bar(util, width=8)} {util_color}[{int(util)}%]{Colors.RESET}"
+                    line4 = f"{_label('W:')} {get_progress_bar(util, width=8)} {util_color}[{int(util)}%]{Colors.RESET}"
                 # Add remaining time (e.g. "6d10h07m")
                 resets_at_str = seven_day.get('resets_at')
                 if resets_at_str:
                     try:
-                        resets_at = datetime.fromisoformat(resets_at_str)
+                        resets_at = _parse_ts(resets_at_str)
                         remaining_s = max(0, (resets_at - datetime.now(timezone.utc)).total_seconds())
                         if remaining_s < 3600:
                             line4 += f" {Colors.BRIGHT_WHITE}{int(remaining_s / 60)}m{Colors.RESET}"
@@ -2777,7 +3045,7 @@ def format_output_tight(ctx):
             else:
                 lines.append(ctx['weekly_line'])
         else:
-            lines.append(f"{Colors.BRIGHT_CYAN}W:{Colors.RESET} --")
+            lines.append(f"{_label('W:')} --")
 
     return lines
 
@@ -2800,7 +3068,7 @@ def format_output_minimal(ctx, terminal_width):
     percentage = ctx['percentage']
     compact_display = format_token_count_short(ctx['compact_tokens'])
     denom = ctx['context_size']
-    threshold_display = format_token_count_short(denom)
+    threshold_display = _format_context_size(denom, short=True)
     percentage_color = get_percentage_color(percentage)
 
     parts = []
@@ -2934,15 +3202,16 @@ def do_setup():
     print(f"Test: echo '{{\"session_id\":\"test\"}}' | {command} --show all")
 
 
-def main():
-    # Force line-buffered stdout to prevent partial output when piped to Claude Code
-    # Without this, Python uses block buffering for pipes, causing intermittent display issues
-    try:
-        sys.stdout.reconfigure(line_buffering=True)
-    except AttributeError:
-        pass  # Python < 3.7
+def _parse_cli_args(argv):
+    """Parse CLI flags. Plain status line renders pass no arguments, so argparse
+    is only imported and built when there is something to parse."""
+    # Initialize args with default values first
+    args = types.SimpleNamespace(show=None, schedule=False, update=False, self_update=False,
+                                 rollback=False, setup=False, version=False, help=False)
+    if not argv:
+        return args
 
-    # Parse command line arguments
+    import argparse
     parser = argparse.ArgumentParser(description='Claude Code statusline with configurable output', add_help=False)
     parser.add_argument('--show', type=str, help='Lines to show: 1,2,3,4 or all (default: use config settings)')
     parser.add_argument('--schedule', action='store_true', help='Show next calendar event (requires gog command)')
@@ -2953,15 +3222,23 @@ def main():
     parser.add_argument('--version', action='store_true', help='Show version')
     parser.add_argument('--help', action='store_true', help='Show help')
 
-    # Initialize args with default values first
-    args = argparse.Namespace(show=None, schedule=False, update=False, self_update=False, rollback=False, setup=False, version=False, help=False)
-
     # Parse arguments, but don't exit on failure (for stdin compatibility)
     try:
-        args, _ = parser.parse_known_args()
+        args, _ = parser.parse_known_args(argv)
     except:
         # Keep the default args initialized above
         pass
+    return args
+
+def main():
+    # Force line-buffered stdout to prevent partial output when piped to Claude Code
+    # Without this, Python uses block buffering for pipes, causing intermittent display issues
+    try:
+        sys.stdout.reconfigure(line_buffering=True)
+    except AttributeError:
+        pass  # Python < 3.7
+
+    args = _parse_cli_args(sys.argv[1:])
     
     # Handle version
     if args.version:
@@ -2970,23 +3247,26 @@ def main():
 
     # Handle help
     if args.help:
-        print(f"ccsl {__version__} - Claude Code Status Line")
-        print("Usage:")
-        print("  echo '{\"session_id\":\"...\"}' | ccsl")
-        print("  echo '{\"session_id\":\"...\"}' | ccsl --show 1,2")
-        print("  echo '{\"session_id\":\"...\"}' | ccsl --show simple")
-        print("  echo '{\"session_id\":\"...\"}' | ccsl --show all")
-        print()
-        print("Options:")
-        print("  --show 1,2,3,4    Show specific lines (comma-separated)")
-        print("  --show simple     Show compact and session lines (2,3)")
-        print("  --show all        Show all lines")
-        print("  --schedule        Show next calendar event (swaps with Line 1)")
-        print("  --setup           Configure Claude Code settings.json")
-        print("  --update          Check for updates now")
-        print("  --rollback        Rollback to previous version")
-        print("  --version         Show version")
-        print("  --help            Show this help")
+        # 1 回の write でまとめて出力
+        sys.stdout.write("\n".join([
+            f"ccsl {__version__} - Claude Code Status Line",
+            "Usage:",
+            "  echo '{\"session_id\":\"...\"}' | ccsl",
+            "  echo '{\"session_id\":\"...\"}' | ccsl --show 1,2",
+            "  echo '{\"session_id\":\"...\"}' | ccsl --show simple",
+            "  echo '{\"session_id\":\"...\"}' | ccsl --show all",
+            "",
+            "Options:",
+            "  --show 1,2,3,4    Show specific lines (comma-separated)",
+            "  --show simple     Show compact and session lines (2,3)",
+            "  --show all        Show all lines",
+            "  --schedule        Show next calendar event (swaps with Line 1)",
+            "  --setup           Configure Claude Code settings.json",
+            "  --update          Check for updates now",
+            "  --rollback        Rollback to previous version",
+            "  --version         Show version",
+            "  --help            Show this help",
+        ]) + "\n")
         return
 
     # Handle setup (early exit, no stdin needed)
@@ -3031,9 +3311,9 @@ def main():
     agent_name = None
 
     try:
-        # Read JSON from stdin
-        input_data = sys.stdin.read()
-        if not input_data.strip():
+        # Read JSON from stdin (bytes: skip text decoding, json.loads detects UTF-8)
+        input_data = getattr(sys.stdin, 'buffer', sys.stdin).read()
+        if not input_data or input_data.isspace():
             # No input provided - just exit silently
             return
         data = json.loads(input_data)
@@ -3048,7 +3328,8 @@ def main():
         if _dump_dest:
             try:
                 with open(Path(_dump_dest).expanduser(), 'a') as _f:
-                    _f.write(f"\n--- {datetime.now().isoformat()} ---\n{input_data.rstrip()}\n")
+                    _dump_text = input_data.decode('utf-8', 'replace') if isinstance(input_data, bytes) else input_data
+                    _f.write(f"\n--- {datetime.now().isoformat()} ---\n{_dump_text.rstrip()}\n")
             except Exception:
                 pass
 
@@ -3148,7 +3429,7 @@ def main():
             # Compute api_block_start_utc from five_hour resets_at
             if ratelimit_data and (ratelimit_data.get('five_hour') or {}).get('resets_at'):
                 try:
-                    resets_at = datetime.fromisoformat(ratelimit_data['five_hour']['resets_at'])
+                    resets_at = _parse_ts(ratelimit_data['five_hour']['resets_at'])
                     api_start = resets_at - timedelta(hours=5)
                     api_block_start_utc = api_start.astimezone(timezone.utc).replace(tzinfo=None)
                 except (ValueError, TypeError):
@@ -3176,9 +3457,7 @@ def main():
                          input_tokens, output_tokens, cache_creation, cache_read) = calculate_tokens_from_transcript(transcript_file)
                     except Exception as e:
                         # Log error for debugging Compact freeze issue
-                        with open(Path.home() / '.claude' / 'statusline-error.log', 'a') as f:
-                            f.write(f"\n{datetime.now()}: Error calculating Compact tokens: {e}\n")
-                            f.write(f"Transcript file: {transcript_file}\n")
+                        _log_error(f"Error calculating Compact tokens: {e}\nTranscript file: {transcript_file}\n")
                         # Use block_stats as fallback if available
                         if block_stats:
                             total_tokens = 0
@@ -3233,7 +3512,9 @@ def main():
         # Get additional info
         active_files = len(workspace.get('active_files', []))
         task_status = data.get('task', {}).get('status', 'idle')
-        current_time = get_time_info()
+        # 現在時刻は1回だけ取得して以降の計算で使い回す
+        now_utc = datetime.now(timezone.utc)
+        current_time = get_time_info(now_utc.astimezone())
         # 5時間ブロック時間計算
         duration_seconds = None
         session_duration = None
@@ -3268,8 +3549,6 @@ def main():
         if metered:
             metered_cost = calculate_metered_cost_from_transcript(data.get('transcript_path')) or 0
         
-        # Format displays - use API tokens for Compact line
-        token_display = format_token_count(compact_tokens)
         percentage_color = get_percentage_color(percentage)
 
         # ========================================
@@ -3304,8 +3583,8 @@ def main():
         # Calculate block progress
         block_progress = 0
         if duration_seconds is not None:
-            hours_elapsed = duration_seconds / 3600
-            block_progress = (hours_elapsed % 5) / 5 * 100
+            # 5h = 18000s 周期内の経過率 (18000s / 100% = 180s)
+            block_progress = (duration_seconds % 18000) / 180
 
         # Generate session time info
         # (legacy fallback display: block_stats start is hour-floored when no
@@ -3319,8 +3598,7 @@ def main():
                 end_time_local = start_time_local + timedelta(hours=5)
                 session_end_time = end_time_local.strftime("%H:%M")
 
-                now_local = datetime.now()
-                if now_local > end_time_local:
+                if now_utc > end_time_local:
                     session_time_info = f"{Colors.BRIGHT_YELLOW}{current_time}{Colors.RESET} {Colors.BRIGHT_YELLOW}(ended at {session_end_time}){Colors.RESET}"
                 else:
                     session_time_info = f"{Colors.BRIGHT_WHITE}{current_time}{Colors.RESET} {Colors.BRIGHT_GREEN}({session_start_time} to {session_end_time}){Colors.RESET}"
@@ -3348,10 +3626,9 @@ def main():
             five_hour = ratelimit_data.get('five_hour')
             if five_hour and five_hour.get('resets_at'):
                 try:
-                    resets_at = datetime.fromisoformat(five_hour['resets_at'])
-                    now = datetime.now(timezone.utc)
+                    resets_at = _parse_ts(five_hour['resets_at'])
                     block_start = resets_at - timedelta(hours=5)
-                    elapsed = (now - block_start).total_seconds()
+                    elapsed = (now_utc - block_start).total_seconds()
                     total = 5 * 3600
                     burn_current_pos = max(0.0, min(1.0, elapsed / total))
                 except (ValueError, TypeError):
@@ -3363,10 +3640,9 @@ def main():
             seven_day = ratelimit_data.get('seven_day')
             if seven_day and seven_day.get('resets_at'):
                 try:
-                    resets_at = datetime.fromisoformat(seven_day['resets_at'])
-                    now = datetime.now(timezone.utc)
+                    resets_at = _parse_ts(seven_day['resets_at'])
                     week_start = resets_at - timedelta(days=7)
-                    elapsed = (now - week_start).total_seconds()
+                    elapsed = (now_utc - week_start).total_seconds()
                     total = 7 * 86400
                     weekly_current_pos = max(0.0, min(1.0, elapsed / total))
                 except (ValueError, TypeError):
@@ -3385,8 +3661,9 @@ def main():
                 'efficiency_ratio': block_stats.get('efficiency_ratio', 0),
                 'current_cost': session_cost
             }
-            burn_line = get_burn_line(session_data, session_id, block_stats, current_block, burn_current_pos)
             burn_timeline = generate_real_burn_timeline(block_stats, current_block, api_block_start_utc)
+            burn_line = get_burn_line(session_data, session_id, block_stats, current_block, burn_current_pos,
+                                      burn_timeline=burn_timeline)
             block_tokens = block_stats.get('total_tokens', 0)
 
         # 従量モデル使用中: この 5h ブロックの従量分コスト (Session 行末尾用)
@@ -3473,8 +3750,9 @@ def main():
             lines.insert(0, warning)
 
         # Output lines (flush=True to avoid partial reads when piped to Claude Code)
+        # 行頭の RESET + 既定色とウィジェット側の色コードが隣接するので、最後に 1 回だけ結合する
         output = "\n".join(f"\033[0m\033[1;97m{line}\033[0m" for line in lines)
-        sys.stdout.write(output + "\n")
+        sys.stdout.write(_coalesce_ansi(output) + "\n")
         sys.stdout.flush()
 
         # Background auto-update check (fire-and-forget, never breaks statusline)
@@ -3491,10 +3769,11 @@ def main():
         
         # Debug logging with traceback
         import traceback
-        with open(Path.home() / '.claude' / 'statusline-error.log', 'a') as f:
-            f.write(f"{datetime.now()}: {e}\n")
-            f.write(traceback.format_exc() + "\n")
-            f.write(f"Input data: {locals().get('input_data', 'No input')}\n\n")
+        logged_input = locals().get('input_data', 'No input')
+        if isinstance(logged_input, bytes):
+            logged_input = logged_input.decode('utf-8', 'replace')
+        _log_error(f"{e}\n{traceback.format_exc()}\n"
+                   f"Input data: {logged_input}\n")
 
 def calculate_tokens_since_time(start_time, session_id):
     """📊 SESSION LINE SYSTEM: Calculate tokens for current session only
@@ -3519,23 +3798,28 @@ def calculate_tokens_since_time(start_time, session_id):
             return 0
         
         # Normalize start_time to UTC for comparison
-        start_time_utc = convert_local_to_utc(start_time)
+        # 行ごとの比較は naive UTC 同士で行い、'Z' 付き文字列は秒までの
+        # 文字列比較で明らかに古い行を datetime を作らずに落とす
+        start_naive_utc = _to_naive_utc(convert_local_to_utc(start_time))
+        start_prefix = start_naive_utc.strftime('%Y-%m-%dT%H:%M:%S')
         
-        session_messages = []
+        # リストに溜めて再走査せず、スカラーへ直接積算する
+        total_tokens = 0
         processed_hashes = set()  # For duplicate removal 
         
-        with open(transcript_file, 'r') as f:
+        with open(transcript_file, 'rb', buffering=JSONL_READ_BUFFER) as f:
             for line in f:
                 try:
-                    data = json.loads(line.strip())
+                    data = json.loads(line)
                     if not data:
                         continue
                     
+                    message = data.get('message') or {}
                     # Remove duplicates: messageId + requestId
-                    message_id = data.get('message', {}).get('id')
+                    message_id = message.get('id')
                     request_id = data.get('requestId')
                     if message_id and request_id:
-                        unique_hash = f"{message_id}:{request_id}"
+                        unique_hash = (message_id, request_id)
                         if unique_hash in processed_hashes:
                             continue  # Skip duplicate
                         processed_hashes.add(unique_hash)
@@ -3546,44 +3830,26 @@ def calculate_tokens_since_time(start_time, session_id):
                         continue
                     
                     # Parse timestamp and normalize to UTC
-                    if isinstance(msg_timestamp, str):
-                        msg_time = datetime.fromisoformat(msg_timestamp.replace('Z', '+00:00'))
-                        if msg_time.tzinfo is None:
-                            msg_time = msg_time.replace(tzinfo=timezone.utc)
-                        msg_time_utc = msg_time.astimezone(timezone.utc)
-                    else:
+                    if not isinstance(msg_timestamp, str):
+                        continue
+                    if msg_timestamp[-1:] == 'Z' and msg_timestamp[:19] < start_prefix:
                         continue
                     
                     # Only include messages from session start time onwards
-                    if msg_time_utc >= start_time_utc:
+                    if _parse_ts_naive_utc(msg_timestamp) >= start_naive_utc:
                         # Check for any messages with usage data (not just assistant)
-                        if data.get('message', {}).get('usage'):
-                            session_messages.append(data)
+                        usage = message.get('usage')
+                        if usage:
+                            # Each message is individual usage; cache tokens included
+                            total_tokens += (usage.get('input_tokens', 0)
+                                             + usage.get('output_tokens', 0)
+                                             + usage.get('cache_creation_input_tokens', 0)
+                                             + usage.get('cache_read_input_tokens', 0))
                 
                 except (json.JSONDecodeError, ValueError, TypeError):
                     continue
         
-        # Sum all usage from session messages (each message is individual usage)
-        total_input_tokens = 0
-        total_output_tokens = 0
-        total_cache_creation = 0
-        total_cache_read = 0
-        
-        for message in session_messages:
-            usage = message.get('message', {}).get('usage', {})
-            if usage:
-                total_input_tokens += usage.get('input_tokens', 0)
-                total_output_tokens += usage.get('output_tokens', 0)
-                total_cache_creation += usage.get('cache_creation_input_tokens', 0)
-                total_cache_read += usage.get('cache_read_input_tokens', 0)
-        
-        #  nonCacheTokens for display (like burn rate indicator)
-        non_cache_tokens = total_input_tokens + total_output_tokens
-        cache_tokens = total_cache_creation + total_cache_read
-        total_with_cache = non_cache_tokens + cache_tokens
-        
-        # Return cache-included tokens (like )
-        return total_with_cache  #  cache tokens in display
+        return total_tokens
         
     except Exception:
         return 0
@@ -3596,6 +3862,37 @@ def calculate_tokens_since_time(start_time, session_id):
 # Block stats / transcript cache management
 # ============================================
 
+def _get_error_log_file():
+    """Get error log file path (lazy initialization)"""
+    global ERROR_LOG_FILE
+    if ERROR_LOG_FILE is None:
+        ERROR_LOG_FILE = os.path.join(os.path.expanduser('~'), '.claude', 'statusline-error.log')
+    return ERROR_LOG_FILE
+
+def _log_error(body):
+    """エラーログに追記（本文の前に時刻を付ける）
+
+    描画は数秒おきに別プロセスで走るので、壊れた入力などで同じエラーが続くと
+    毎回同じ traceback が積み上がる。ログの mtime が ERROR_LOG_REPEAT_WINDOW 秒以内で
+    末尾が同じ本文なら書き込まない。ログ書き込みの失敗は握りつぶす。
+    """
+    log_file = _get_error_log_file()
+    data = body.encode('utf-8', 'replace')
+    try:
+        st = os.stat(log_file)
+        if time.time() - st.st_mtime < ERROR_LOG_REPEAT_WINDOW and st.st_size >= len(data):
+            with open(log_file, 'rb') as f:
+                f.seek(-len(data), os.SEEK_END)
+                if f.read() == data:
+                    return
+    except OSError:
+        pass
+    try:
+        with open(log_file, 'ab') as f:
+            f.write(f"\n{datetime.now()}: ".encode() + data)
+    except OSError:
+        pass
+
 def _get_block_stats_cache_file():
     """Get block stats cache file path (lazy initialization)"""
     global BLOCK_STATS_CACHE_FILE
@@ -3690,17 +3987,28 @@ def _get_cached_block_data(session_id, api_block_start_utc=None):
     block_stats = None
     current_block = None
     try:
-        all_messages = load_all_messages_chronologically(transcript_files=transcript_files)
+        # 必要な時間窓より古いファイル・行は読み込み時点で除外
+        # (API窓: ブロック開始以降 / フォールバック: detect_five_hour_blocks の直近6時間)
+        if api_block_start_utc is not None:
+            since = api_block_start_utc
+        else:
+            since = datetime.now(timezone.utc) - timedelta(hours=6)
+        all_messages = load_all_messages_chronologically(transcript_files=transcript_files, since=since)
 
         if api_block_start_utc is not None:
             # Use API-derived window for precise message filtering (bypasses floor_to_hour drift)
             api_block_end_utc = api_block_start_utc + timedelta(hours=5)
+            # aware なメッセージ時刻は aware 境界と直接比較（1件ごとの UTC 変換を省く）
+            aware_start = api_block_start_utc.replace(tzinfo=timezone.utc)
+            aware_end = api_block_end_utc.replace(tzinfo=timezone.utc)
             window_messages = []
             for msg in all_messages:
                 msg_time = msg['timestamp']
-                if hasattr(msg_time, 'tzinfo') and msg_time.tzinfo:
-                    msg_time = msg_time.astimezone(timezone.utc).replace(tzinfo=None)
-                if api_block_start_utc <= msg_time < api_block_end_utc:
+                if msg_time.tzinfo:
+                    in_window = aware_start <= msg_time < aware_end
+                else:
+                    in_window = api_block_start_utc <= msg_time < api_block_end_utc
+                if in_window:
                     window_messages.append(msg)
 
             if window_messages:
@@ -3719,16 +4027,18 @@ def _get_cached_block_data(session_id, api_block_start_utc=None):
                 blocks = detect_five_hour_blocks(all_messages)
             except Exception:
                 blocks = []
-            current_block = find_current_session_block(blocks, session_id)
+            # session → block の index はブロック検出直後に一度だけ作る
+            session_index = _index_blocks_by_session(blocks)
+            current_block = find_current_session_block(blocks, session_id, session_index)
             if current_block:
                 try:
                     block_stats = calculate_block_statistics_with_deduplication(current_block, session_id)
                 except Exception:
                     block_stats = None
             elif blocks:
-                active_blocks = [b for b in blocks if b.get('is_active', False)]
-                if active_blocks:
-                    current_block = active_blocks[-1]
+                # 最後の active ブロック: リストを作らず末尾から探して早期終了
+                current_block = next((b for b in reversed(blocks) if b.get('is_active')), None)
+                if current_block:
                     try:
                         block_stats = calculate_block_statistics_with_deduplication(current_block, session_id)
                     except Exception:
@@ -3794,18 +4104,43 @@ def _load_transcript_stats_cache(file_path):
         pass
     return None
 
-def _save_transcript_stats_cache(file_path, stats_tuple):
-    """Write transcript stats cache atomically."""
+def _load_transcript_resume_state(file_path):
+    """Return cached stats usable as a starting point for an incremental read.
+
+    Valid regardless of TTL/mtime as long as it is the same file (path + inode)
+    and the file has not shrunk below the consumed offset. Returns dict or None.
+    """
+    cache_file = _get_transcript_stats_cache_file()
+    try:
+        with open(cache_file, 'r') as f:
+            cached = json.load(f)
+        if (cached.get('file_path') == str(file_path)
+                and isinstance(cached.get('file_offset'), int)):
+            st = file_path.stat()
+            if cached.get('file_ino') == st.st_ino and cached['file_offset'] <= st.st_size:
+                return cached
+    except (json.JSONDecodeError, OSError, AttributeError):
+        pass
+    return None
+
+def _save_transcript_stats_cache(file_path, stats_tuple, file_offset=None):
+    """Write transcript stats cache atomically.
+
+    file_offset: bytes consumed (complete lines only) — enables incremental reads.
+    """
     cache_file = _get_transcript_stats_cache_file()
     (total_tokens, message_count, error_count, user_messages, assistant_messages,
      input_tokens, output_tokens, cache_creation, cache_read) = stats_tuple
     try:
+        st = file_path.stat()
         tmp = cache_file.with_suffix('.tmp')
         with open(tmp, 'w') as f:
             json.dump({
                 'timestamp': time.time(),
                 'file_path': str(file_path),
-                'file_mtime': file_path.stat().st_mtime,
+                'file_mtime': st.st_mtime,
+                'file_ino': st.st_ino,
+                'file_offset': file_offset,
                 'total_tokens': total_tokens,
                 'message_count': message_count,
                 'error_count': error_count,
@@ -4254,7 +4589,7 @@ def get_api_session_time_range(ratelimit_data):
     if not five_hour or not five_hour.get('resets_at'):
         return None
     try:
-        resets_at = datetime.fromisoformat(five_hour['resets_at'])
+        resets_at = _parse_ts(five_hour['resets_at'])
         # Window runs from the first message to exactly 5h later (resets_at).
         # Show the actual boundaries — rounding to the hour can place "now"
         # outside the displayed window (e.g. 8:40pm start shown as 9pm).
@@ -4323,68 +4658,150 @@ def generate_weekly_timeline(ratelimit_data, num_segments=20):
 
     return timeline, metered_cost
 
+def _get_weekly_file_cache_file():
+    """Get weekly per-file cache path (lazy initialization)"""
+    global WEEKLY_FILE_CACHE_FILE
+    if WEEKLY_FILE_CACHE_FILE is None:
+        WEEKLY_FILE_CACHE_FILE = Path.home() / '.claude' / '.weekly_file_cache.json'
+    return WEEKLY_FILE_CACHE_FILE
+
+def _load_weekly_file_cache(resets_at_str, num_segments):
+    """Per-file rows from the previous scan of the same window ({path: entry})."""
+    try:
+        with open(_get_weekly_file_cache_file(), 'r') as f:
+            cached = json.load(f)
+        if cached.get('resets_at') == resets_at_str and cached.get('num_segments') == num_segments:
+            return cached.get('files', {})
+    except (json.JSONDecodeError, OSError, AttributeError):
+        pass
+    return {}
+
+def _save_weekly_file_cache(resets_at_str, num_segments, files):
+    """Write per-file rows atomically (only files seen in this scan are kept)."""
+    cache_file = _get_weekly_file_cache_file()
+    try:
+        tmp = cache_file.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({'resets_at': resets_at_str, 'num_segments': num_segments,
+                       'files': files}, f)
+        tmp.rename(cache_file)
+    except OSError:
+        pass
+
+def _scan_weekly_file(transcript_file, window_start_utc, window_start_prefix, num_segments, seg_seconds):
+    """1 ファイル分の usage 行を [dedup_hash|None, segment, tokens, metered_cost] のリストで返す。
+
+    ファイル間の重複除去は呼び出し側で行うため、ここではファイル内の重複だけを落とす。
+    """
+    rows = []
+    seen = set()
+    try:
+        # バイナリで読み json.loads に bytes を直接渡す（テキスト層のデコードを省く）。
+        # mmap + find でファイル全体に usage が 1 つも無ければ行ループ自体を省略
+        with open(transcript_file, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm.find(b'"usage"') < 0:
+                return rows
+            for line in iter(mm.readline, b''):
+                # usage を持たない行 (user/tool_result/summary 等) はパース前に捨てる
+                if b'"usage"' not in line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                    ts_str = entry.get('timestamp')
+                    if not ts_str:
+                        continue
+                    # UTC ('Z') の ISO 文字列は辞書順=時系列なので、窓より古い行は
+                    # datetime を作らずに文字列比較で捨てる
+                    if ts_str[-1:] == 'Z' and ts_str[:19] < window_start_prefix:
+                        continue
+
+                    if entry.get('type') != 'assistant':
+                        continue
+                    # message は 1 回だけ取り出して usage/model/id で使い回す
+                    msg = entry.get('message') or {}
+                    usage = msg.get('usage') if msg else entry.get('usage')
+                    if not usage:
+                        continue
+
+                    # message.id first: entry uuid differs per content-block
+                    # line of the same response
+                    msg_id = msg.get('id') or entry.get('uuid')
+                    req_id = entry.get('requestId')
+                    h = None
+                    if msg_id and req_id:
+                        h = f"{msg_id}:{req_id}"
+                        if h in seen:
+                            continue
+                        seen.add(h)
+
+                    ts = _parse_ts_naive_utc(ts_str)
+
+                    if ts < window_start_utc:
+                        continue
+
+                    elapsed = (ts - window_start_utc).total_seconds()
+                    seg = min(num_segments - 1, int(elapsed / seg_seconds))
+
+                    tokens = usage.get('input_tokens', 0) + usage.get('output_tokens', 0)
+                    rows.append([h, seg, tokens, _metered_usage_cost(msg.get('model'), usage)])
+
+                except (json.JSONDecodeError, ValueError, KeyError):
+                    continue
+    except (OSError, ValueError):  # ValueError: 空ファイルは mmap できない
+        pass
+    return rows
+
 def _scan_weekly_timeline(resets_at_str, num_segments):
-    """Scan JSONL transcripts: token timeline + 従量モデル分コストを同時集計。"""
+    """Scan JSONL transcripts: token timeline + 従量モデル分コストを同時集計。
+
+    終了済みセッションの transcript は変化しないので、ファイルごとの集計行を
+    (mtime_ns, size) 付きでキャッシュし、変化したファイルだけを再パースする。
+    """
     timeline = [0] * num_segments
     metered_cost = 0.0
     total_seconds = 7 * 86400
     seg_seconds = total_seconds / num_segments
 
     try:
-        resets_at = datetime.fromisoformat(resets_at_str)
+        resets_at = _parse_ts(resets_at_str)
         window_start = resets_at - timedelta(days=7)
         window_start_utc = window_start.astimezone(timezone.utc).replace(tzinfo=None)
+        window_start_prefix = window_start_utc.strftime('%Y-%m-%dT%H:%M:%S')
+
+        # 窓の開始より前に最終更新されたファイルは開かない（最大 168h）
+        window_hours = (datetime.now(timezone.utc).replace(tzinfo=None) - window_start_utc).total_seconds() / 3600
+        transcript_files = find_all_transcript_files(hours_limit=max(1, min(168, window_hours)))
 
-        transcript_files = find_all_transcript_files(hours_limit=168)
+        cached_files = _load_weekly_file_cache(resets_at_str, num_segments)
+        scanned_files = {}
         processed_hashes = set()
 
         for transcript_file in transcript_files:
+            key = str(transcript_file)
             try:
-                with open(transcript_file, 'r') as f:
-                    for line in f:
-                        try:
-                            entry = json.loads(line.strip())
-                            if not entry.get('timestamp'):
-                                continue
-
-                            entry_type = entry.get('type')
-                            usage = None
-                            entry_model = None
-                            if entry_type == 'assistant':
-                                msg = entry.get('message', {})
-                                usage = msg.get('usage') if msg else entry.get('usage')
-                                entry_model = (msg or {}).get('model')
-                            if not usage:
-                                continue
-
-                            # message.id first: entry uuid differs per content-block
-                            # line of the same response
-                            msg_id = (entry.get('message', {}) or {}).get('id') or entry.get('uuid')
-                            req_id = entry.get('requestId')
-                            if msg_id and req_id:
-                                h = f"{msg_id}:{req_id}"
-                                if h in processed_hashes:
-                                    continue
-                                processed_hashes.add(h)
-
-                            ts = datetime.fromisoformat(
-                                entry['timestamp'].replace('Z', '+00:00')
-                            ).astimezone(timezone.utc).replace(tzinfo=None)
-
-                            if ts < window_start_utc:
-                                continue
-
-                            elapsed = (ts - window_start_utc).total_seconds()
-                            seg = min(num_segments - 1, int(elapsed / seg_seconds))
-
-                            tokens = usage.get('input_tokens', 0) + usage.get('output_tokens', 0)
-                            timeline[seg] += tokens
-                            metered_cost += _metered_usage_cost(entry_model, usage)
-
-                        except (json.JSONDecodeError, ValueError, KeyError):
-                            continue
-            except (FileNotFoundError, PermissionError):
+                st = os.stat(transcript_file)
+            except OSError:
                 continue
+            fingerprint = [st.st_mtime_ns, st.st_size]
+            cached = cached_files.get(key)
+            if isinstance(cached, dict) and cached.get('fp') == fingerprint:
+                rows = cached.get('rows', [])
+            else:
+                rows = _scan_weekly_file(transcript_file, window_start_utc, window_start_prefix,
+                                         num_segments, seg_seconds)
+            scanned_files[key] = {'fp': fingerprint, 'rows': rows}
+
+            # ファイル間の重複除去（同じ応答が resume 先の transcript にも残る）
+            for h, seg, tokens, cost in rows:
+                if h:
+                    if h in processed_hashes:
+                        continue
+                    processed_hashes.add(h)
+                timeline[seg] += tokens
+                metered_cost += cost
+
+        _save_weekly_file_cache(resets_at_str, num_segments, scanned_files)
 
     except (ValueError, TypeError) as e:
         print(f"[ccsl] weekly scan error: {e}", file=sys.stderr)
@@ -4410,54 +4827,52 @@ def get_weekly_line(ratelimit_data, weekly_timeline=None, sparkline_width=20, me
 
     utilization = seven_day.get('utilization', 0)
     util_color = _get_utilization_color(utilization)
+    # Colors は属性アクセスごとに環境変数を見るので、行内で使う分は一度だけ読む
+    reset = Colors.RESET
+    white = Colors.BRIGHT_WHITE
 
     # Calculate current position within the 7-day window (0.0 = start, 1.0 = reset)
+    # resets_at / now は残り時間表示でも使うので 1 回だけ求める
     current_pos = None
+    remaining_seconds = None
     resets_at_str = seven_day.get('resets_at')
     if resets_at_str:
         try:
-            resets_at = datetime.fromisoformat(resets_at_str)
+            resets_at = _parse_ts(resets_at_str)
             now = datetime.now(timezone.utc)
             week_start = resets_at - timedelta(days=7)
             elapsed = (now - week_start).total_seconds()
             total = 7 * 86400
             current_pos = max(0.0, min(1.0, elapsed / total))
+            remaining_seconds = max(0, (resets_at - now).total_seconds())
         except (ValueError, TypeError):
             pass
 
     parts = []
-    parts.append(f"{Colors.BRIGHT_CYAN}Weekly:  {Colors.RESET}")
+    parts.append(_label('Weekly:  '))
     if weekly_timeline:
         parts.append(create_sparkline(weekly_timeline, width=sparkline_width, current_pos=current_pos))
     else:
         parts.append(create_sparkline([0] * sparkline_width, width=sparkline_width, current_pos=current_pos))
-    parts.append(f" {util_color}[{int(utilization)}%]{Colors.RESET}")
+    parts.append(f" {util_color}[{int(utilization)}%]{reset}")
 
     # Time remaining until reset
-    resets_at_str = seven_day.get('resets_at')
-    if resets_at_str:
-        try:
-            resets_at = datetime.fromisoformat(resets_at_str)
-            now = datetime.now(timezone.utc)
-            remaining = resets_at - now
-            remaining_seconds = max(0, remaining.total_seconds())
-            if remaining_seconds < 3600:
-                parts.append(f" {Colors.BRIGHT_WHITE}{int(remaining_seconds / 60)}m{Colors.RESET}")
-            elif remaining_seconds < 86400:
-                hours = int(remaining_seconds / 3600)
-                mins = int((remaining_seconds % 3600) / 60)
-                parts.append(f" {Colors.BRIGHT_WHITE}{hours}h{mins:02d}m{Colors.RESET}")
-            else:
-                days = int(remaining_seconds / 86400)
-                hours = int((remaining_seconds % 86400) / 3600)
-                mins = int((remaining_seconds % 3600) / 60)
-                parts.append(f" {Colors.BRIGHT_WHITE}{days}d{hours}h{mins:02d}m{Colors.RESET}")
-        except (ValueError, TypeError):
-            pass
+    if remaining_seconds is not None:
+        if remaining_seconds < 3600:
+            parts.append(f" {white}{int(remaining_seconds / 60)}m{reset}")
+        elif remaining_seconds < 86400:
+            hours = int(remaining_seconds / 3600)
+            mins = int((remaining_seconds % 3600) / 60)
+            parts.append(f" {white}{hours}h{mins:02d}m{reset}")
+        else:
+            days = int(remaining_seconds / 86400)
+            hours = int((remaining_seconds % 86400) / 3600)
+            mins = int((remaining_seconds % 3600) / 60)
+            parts.append(f" {white}{days}d{hours}h{mins:02d}m{reset}")
 
     # 7 日窓の従量モデル分コスト (Ext = 財布の現在地、はその後ろで最後尾を維持)
     if metered_cost and metered_cost > 0:
-        parts.append(f", {Colors.BRIGHT_YELLOW}${metered_cost:.0f}{Colors.RESET}")
+        parts.append(f", {Colors.BRIGHT_YELLOW}${metered_cost:.0f}{reset}")
 
     # Extra usage info
     extra = ratelimit_data.get('extra_usage')
@@ -4469,16 +4884,17 @@ def get_weekly_line(ratelimit_data, weekly_timeline=None, sparkline_width=20, me
         limit_val = limit / 100
         used_str = f"${int(used_val)}" if used_val == int(used_val) else f"${used_val:.2f}"
         limit_str = f"${limit_val:.0f}"
-        parts.append(f", {Colors.BRIGHT_YELLOW}Ext:{Colors.RESET}")
+        parts.append(", " + _label('Ext:', 'BRIGHT_YELLOW'))
         if limit_val > 0:
             pct = int(used_val / limit_val * 100)
             pct_color = _get_utilization_color(pct)
-            parts.append(f" {pct_color}{pct}%{Colors.RESET}")
-        parts.append(f" {Colors.BRIGHT_WHITE}{used_str}/{limit_str}{Colors.RESET}")
+            parts.append(f" {pct_color}{pct}%{reset}")
+        parts.append(f" {white}{used_str}/{limit_str}{reset}")
 
     return "".join(parts)
 
-def get_burn_line(current_session_data=None, session_id=None, block_stats=None, current_block=None, burn_current_pos=None):
+def get_burn_line(current_session_data=None, session_id=None, block_stats=None, current_block=None, burn_current_pos=None,
+                  burn_timeline=None):
     """Generate burn line display (Line 4)
 
     Creates the Burn line showing session tokens and burn rate.
@@ -4490,6 +4906,7 @@ def get_burn_line(current_session_data=None, session_id=None, block_stats=None,
         current_session_data: Session data with session tokens
         session_id: Current session ID for sparkline data
         block_stats: Block statistics with burn_timeline data
+        burn_timeline: Precomputed 20-segment timeline (skips a second pass over block messages)
     Returns:
         str: Formatted burn line for display
     """
@@ -4516,18 +4933,19 @@ def get_burn_line(current_session_data=None, session_id=None, block_stats=None,
         burn_rate_formatted = format_token_count_short(int(burn_rate))
         
         # Generate 5-hour timeline sparkline from REAL message data ONLY
-        if block_stats and 'start_time' in block_stats and current_block:
-            burn_timeline = generate_real_burn_timeline(block_stats, current_block)
-        else:
-            burn_timeline = [0] * 20
+        if burn_timeline is None:
+            if block_stats and 'start_time' in block_stats and current_block:
+                burn_timeline = generate_real_burn_timeline(block_stats, current_block)
+            else:
+                burn_timeline = [0] * 20
         
         sparkline = create_sparkline(burn_timeline, width=20, current_pos=burn_current_pos, future_style="bar")
         
-        return (f"{Colors.BRIGHT_CYAN}Burn:   {Colors.RESET} {sparkline} "
+        return (f"{_label('Burn:   ')} {sparkline} "
                 f"{Colors.BRIGHT_WHITE}{tokens_formatted} token(w/cache){Colors.RESET}, Rate: {burn_rate_formatted} t/m")
 
     except Exception as e:
         print(f"[ccsl] burn line error: {e}", file=sys.stderr)
-        return f"{Colors.BRIGHT_CYAN}Burn:   {Colors.RESET} {Colors.BRIGHT_WHITE}ERROR{Colors.RESET}"
+        return f"{_label('Burn:   ')} {_label('ERROR', 'BRIGHT_WHITE')}"
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,15 +1,20 @@
 """Tests for statusline.py — unit tests + smoke tests."""
 
+import contextlib
+import io
 import json
 import os
 import re
 import subprocess
 import sys
 import time
+import types
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 
+import pytest
+
 # Add project root to path so we can import statusline
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -57,6 +62,11 @@ class TestFormatTokenCountShort:
         assert statusline.format_token_count_short(999) == "999"
         assert statusline.format_token_count_short(0) == "0"
 
+    def test_context_size_variants(self):
+        assert statusline._format_context_size(1000000) == "1.0M"
+        assert statusline._format_context_size(1000000, short=True) == "1.0M"
+        assert statusline._format_context_size(200000, short=True) == "200K"
+
 
 class TestShortenModelName:
     def test_normal_mode(self):
@@ -83,6 +93,12 @@ class TestShortenModelName:
         assert statusline.shorten_model_name("Fable 5 (1M context)", tight=True) == "Fab5"
         assert statusline.shorten_model_name("Claude Fable 5", tight=True) == "Fab5"
 
+    def test_mixed_case_tight_and_memoized(self):
+        statusline.shorten_model_name.cache_clear()
+        assert statusline.shorten_model_name("claude OPUS 4.6", tight=True) == "Op4.6"
+        assert statusline.shorten_model_name("claude OPUS 4.6", tight=True) == "Op4.6"
+        assert statusline.shorten_model_name.cache_info().hits == 1
+
     def test_raw_model_id(self):
         # Some CC versions pass the raw model id as display_name.
         assert statusline.shorten_model_name("claude-fable-5[1m]") == "Fable 5"
@@ -138,6 +154,11 @@ class TestGetDisplayWidth:
     def test_empty(self):
         assert statusline.get_display_width("") == 0
 
+    def test_mixed_width_with_color(self):
+        # ASCII 2 + 全角 2x2 + 絵文字(W) 2 + 半角カナ 1
+        text = "\033[1;96mab\u6d4b\u8bd5\033[0m\U0001F525\uff71"
+        assert statusline.get_display_width(text) == 2 + 4 + 2 + 1
+
 
 class TestStripAnsi:
     def test_strips_color(self):
@@ -146,9 +167,20 @@ class TestStripAnsi:
     def test_no_ansi(self):
         assert statusline.strip_ansi("plain") == "plain"
 
+    def test_no_escape_skips_regex(self):
+        with patch.object(statusline, '_ANSI_RE') as mock_re:
+            assert statusline.strip_ansi("plain 日本語") == "plain 日本語"
+        mock_re.sub.assert_not_called()
+
     def test_multiple_codes(self):
         assert statusline.strip_ansi("\033[1m\033[91mbold red\033[0m") == "bold red"
 
+    def test_dynamic_padding_ignores_color_codes(self):
+        compact = "\033[1;96mContext:\033[0m 1.0K/200.0K"
+        session = "\033[1;96mSession:\033[0m 1h/5h"
+        assert statusline.calculate_dynamic_padding(compact, session) == ' ' * 7
+        assert statusline.calculate_dynamic_padding(session, compact) == ' '
+
 
 class TestGetProgressBar:
     def test_zero_percent(self):
@@ -204,6 +236,16 @@ class TestGetProgressBar:
             clean = statusline.strip_ansi(bar)
             assert len(clean) == 20, f"Width mismatch at {pct}%: got {len(clean)}"
 
+    def test_current_segment(self):
+        bar = statusline.get_progress_bar(30, width=10, show_current_segment=True)
+        assert statusline.strip_ansi(bar) == "███▓▒▒▒▒▒▒"
+        # 同じ入力はメモ化された同一文字列を返す
+        assert statusline.get_progress_bar(30, width=10, show_current_segment=True) == bar
+
+    def test_current_segment_full_falls_back_to_filled(self):
+        bar = statusline.get_progress_bar(100, width=10, show_current_segment=True)
+        assert statusline.strip_ansi(bar) == "█" * 10
+
 
 class TestCreateSparkline:
     def test_empty(self):
@@ -250,6 +292,55 @@ class TestCreateSparkline:
         assert len(clean) == 4
         assert statusline.Colors.FUTURE_GRAY in result
 
+    def test_color_bands_with_color(self):
+        """Low/mid/high values render green/yellow/red; same-color runs share one escape"""
+        import os
+        saved = os.environ.pop('NO_COLOR', None)
+        try:
+            C = statusline.Colors
+            result = statusline.create_sparkline([0, 5, 10], width=3)
+            assert result == (C.BRIGHT_GREEN + "▁" + C.BRIGHT_YELLOW + "▅"
+                              + C.BRIGHT_RED + "█" + C.RESET)
+            runs = statusline.create_sparkline([0, 0, 10, 10, 0, 0], width=6, current_pos=0.5)
+            assert runs == (C.BRIGHT_GREEN + "▁▁" + C.BRIGHT_RED + "██"
+                            + C.FUTURE_GRAY + "▁▁" + C.RESET)
+        finally:
+            if saved is not None:
+                os.environ['NO_COLOR'] = saved
+        # NO_COLOR 復帰後は色なしで描画される
+        assert statusline.create_sparkline([0, 5, 10], width=3) == "▁▅█"
+
+
+class TestLabel:
+    def test_label_follows_color_state(self):
+        import os
+        assert statusline._label('Ext:', 'BRIGHT_YELLOW') == 'Ext:'
+        saved = os.environ.pop('NO_COLOR', None)
+        try:
+            C = statusline.Colors
+            assert statusline._label('Ext:', 'BRIGHT_YELLOW') == C.BRIGHT_YELLOW + 'Ext:' + C.RESET
+            assert statusline._label('Context:') == C.BRIGHT_CYAN + 'Context:' + C.RESET
+        finally:
+            if saved is not None:
+                os.environ['NO_COLOR'] = saved
+        assert statusline._label('Ext:', 'BRIGHT_YELLOW') == 'Ext:'
+
+
+class TestCoalesceAnsi:
+    def test_adjacent_codes_merged(self):
+        s = '\x1b[0m\x1b[1;97m\x1b[1;96mab\x1b[0m'
+        assert statusline._coalesce_ansi(s) == '\x1b[0;1;97;1;96mab\x1b[0m'
+
+    def test_codes_before_reset_dropped(self):
+        s = 'a\x1b[1;96m\x1b[0mb\x1b[38;5;0m\x1b[m'
+        assert statusline._coalesce_ansi(s) == 'a\x1b[0mb\x1b[0m'
+
+    def test_visible_text_unchanged(self):
+        s = '\x1b[32mx\x1b[0m \x1b[1m\x1b[33my\x1b[0m'
+        out = statusline._coalesce_ansi(s)
+        assert statusline.strip_ansi(out) == statusline.strip_ansi(s)
+        assert len(out) < len(s)
+
 
 class TestGetPercentageColor:
     def test_green_below_80(self):
@@ -307,6 +398,21 @@ class TestFormatCost:
 
 
 class TestCalculateCost:
+    def test_rate_resolution_memoized(self):
+        statusline._resolve_model_rates.cache_clear()
+        first = statusline._resolve_model_rates("Sonnet 4.6", "claude-sonnet-4-6")
+        again = statusline._resolve_model_rates("Sonnet 4.6", "claude-sonnet-4-6")
+        assert first == again
+        assert statusline._resolve_model_rates.cache_info().hits == 1
+
+    def test_zero_usage_short_circuits(self):
+        statusline._resolve_model_rates.cache_clear()
+        assert statusline.calculate_cost(0, 0, 0, 0, model_name="Opus 4") == 0.0
+        assert statusline._resolve_model_rates.cache_info().misses == 0
+        # 5m/1h 分割のみ非 0 でも計算される
+        assert statusline.calculate_cost(0, 0, 0, 0, model_name="Opus 4",
+                                         cache_creation_1h=1_000_000) > 0
+
     def test_opus_pricing(self):
         cost = statusline.calculate_cost(
             input_tokens=1000000, output_tokens=100000,
@@ -624,20 +730,52 @@ class TestDoSetup:
 
 
 class TestSmoke:
-    def _run(self, input_data):
+    def _run(self, input_data, env=None):
+        """main() をプロセス内で実行（ケースごとのインタプリタ起動+import を省く）。
+
+        実スクリプトとしての起動は test_script_entry_point と TestSmokeExtended が見る。
+        """
         # Force a deterministic terminal size: statusline prefers the real tmux
         # pane size (TMUX env), which varies by where the test happens to run.
+        stdout, stderr = io.StringIO(), io.StringIO()
+        stdin = io.TextIOWrapper(io.BytesIO(input_data.encode('utf-8')), encoding='utf-8')
+        returncode = 0
+        with patch.dict(os.environ, {'COLUMNS': '200', 'LINES': '50', **(env or {})}), \
+                patch.object(sys, 'argv', [STATUSLINE_PATH]), \
+                patch.object(sys, 'stdin', stdin), \
+                patch.object(statusline, 'maybe_check_update'), \
+                contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            for key in ('TMUX', 'TMUX_PANE', 'TERM'):
+                os.environ.pop(key, None)  # patch.dict が元に戻す
+            try:
+                statusline.main()
+            except SystemExit as e:
+                returncode = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        return types.SimpleNamespace(returncode=returncode, stdout=stdout.getvalue(),
+                                     stderr=stderr.getvalue())
+
+    def test_invalid_json_logs_decoded_input(self, tmp_path, monkeypatch):
+        log_file = str(tmp_path / 'statusline-error.log')
+        monkeypatch.setattr(statusline, 'ERROR_LOG_FILE', log_file)
+        result = self._run('{"model":{"display_name":"オーパス"')
+        assert '[Error]' in result.stdout
+        text = open(log_file, encoding='utf-8').read()
+        assert 'Input data: {"model":{"display_name":"オーパス"' in text
+        assert "b'" not in text
+
+    def test_script_entry_point(self):
         env = {k: v for k, v in os.environ.items()
                if k not in ('TMUX', 'TMUX_PANE', 'TERM')}
         env['COLUMNS'] = '200'
         env['LINES'] = '50'
-        return subprocess.run(
+        result = subprocess.run(
             [sys.executable, STATUSLINE_PATH],
-            input=input_data,
+            input=json.dumps({"model": {"display_name": "Opus 4.6"}}),
             capture_output=True, text=True,
             timeout=10,
             env=env,
         )
+        self._assert_output(result)
 
     def _assert_output(self, result):
         """Common assertions: exit 0, meaningful stdout, no stderr errors."""
@@ -791,19 +929,11 @@ class TestSmoke:
             "contextWindow": {"context_window_size": 200000},  # wrong casing
         })
         # Silent by default.
-        silent = subprocess.run(
-            [sys.executable, STATUSLINE_PATH],
-            input=bad, capture_output=True, text=True, timeout=10,
-            env={**os.environ, 'STATUSLINE_DEBUG': '0'},
-        )
+        silent = self._run(bad, env={'STATUSLINE_DEBUG': '0'})
         assert 'stdin schema drift' not in silent.stderr
 
         # Loud when STATUSLINE_DEBUG=1.
-        loud = subprocess.run(
-            [sys.executable, STATUSLINE_PATH],
-            input=bad, capture_output=True, text=True, timeout=10,
-            env={**os.environ, 'STATUSLINE_DEBUG': '1'},
-        )
+        loud = self._run(bad, env={'STATUSLINE_DEBUG': '1'})
         assert loud.returncode == 0  # crash-free regardless
         assert 'stdin schema drift' in loud.stderr
 
@@ -1053,6 +1183,77 @@ class TestTranscriptStatsCache:
         assert cached['file_path'] == str(transcript)
         assert cached['file_mtime'] == transcript.stat().st_mtime
 
+    def test_prefilter_skips_non_message_lines(self, tmp_path):
+        """summary/progress lines are skipped; spaced and compact JSON both counted."""
+        content = '\n'.join([
+            '{"type":"summary","summary":"x"}',
+            '{"type": "user", "timestamp": "2026-02-26T05:00:00Z"}',
+            'not json "assistant"',
+            json.dumps({'type': 'assistant',
+                        'message': {'usage': {'input_tokens': 10, 'output_tokens': 5}}}),
+        ]) + '\n'
+        transcript = self._make_transcript(tmp_path, content)
+        cache_file = tmp_path / '.transcript_stats_cache.json'
+
+        with patch.object(statusline, '_get_transcript_stats_cache_file', return_value=cache_file):
+            result = statusline.calculate_tokens_from_transcript(transcript)
+
+        assert result[:5] == (15, 2, 0, 1, 1)
+
+    def test_last_nonzero_usage_wins(self, tmp_path):
+        """Context fill = last assistant usage; zero usage (error replies) is ignored."""
+        def asst(**usage):
+            return json.dumps({'type': 'assistant', 'message': {'usage': usage}})
+        content = '\n'.join([
+            asst(input_tokens=100, output_tokens=10),
+            asst(input_tokens=200, cache_read_input_tokens=50, output_tokens=20),
+            asst(input_tokens=0, output_tokens=0),
+        ]) + '\n'
+        transcript = self._make_transcript(tmp_path, content)
+        cache_file = tmp_path / '.transcript_stats_cache.json'
+
+        with patch.object(statusline, '_get_transcript_stats_cache_file', return_value=cache_file):
+            result = statusline.calculate_tokens_from_transcript(transcript)
+
+        assert result[0] == 270
+        assert result[5:] == (200, 20, 0, 50)
+
+    def test_incremental_read_resumes_from_offset(self, tmp_path):
+        """Appended lines are read from the cached offset; earlier counts carry over."""
+        def asst(n):
+            return json.dumps({'type': 'assistant',
+                               'message': {'usage': {'input_tokens': n, 'output_tokens': 1}}}) + '\n'
+        transcript = tmp_path / 'transcript.jsonl'
+        transcript.write_text('{"type":"user"}\n' + asst(10) + '{"type":"assi')  # 書き込み途中
+        cache_file = tmp_path / '.transcript_stats_cache.json'
+
+        with patch.object(statusline, '_get_transcript_stats_cache_file', return_value=cache_file):
+            first = statusline.calculate_tokens_from_transcript(transcript)
+            consumed = json.loads(cache_file.read_text())['file_offset']
+            with open(transcript, 'a') as f:
+                f.write('stant"}\n' + asst(20))
+            with patch.object(statusline, '_load_transcript_stats_cache', return_value=None):
+                second = statusline.calculate_tokens_from_transcript(transcript)
+
+        assert first[:5] == (11, 2, 0, 1, 1)
+        assert consumed == len('{"type":"user"}\n' + asst(10))
+        assert second[:5] == (21, 4, 0, 1, 3)
+        assert json.loads(cache_file.read_text())['file_offset'] == transcript.stat().st_size
+
+    def test_invalid_utf8_line_skipped(self, tmp_path):
+        """Binary read: a corrupt line is skipped instead of aborting the scan."""
+        transcript = tmp_path / 'transcript.jsonl'
+        transcript.write_bytes(
+            b'{"type":"user","x":"\xff\xfe"}\n'
+            + json.dumps({'type': 'assistant',
+                          'message': {'usage': {'input_tokens': 3, 'output_tokens': 4}}}).encode() + b'\n')
+        cache_file = tmp_path / '.transcript_stats_cache.json'
+
+        with patch.object(statusline, '_get_transcript_stats_cache_file', return_value=cache_file):
+            result = statusline.calculate_tokens_from_transcript(transcript)
+
+        assert result[0] == 7
+
 
 # ============================================
 # Test Group 1: get_total_tokens() — Token aggregation
@@ -1106,6 +1307,12 @@ class TestGetTotalTokens:
 
 
 class TestGetGitInfo:
+    @pytest.fixture(autouse=True)
+    def _isolated_cache(self, tmp_path):
+        cache_file = tmp_path / '.git_status_cache.json'
+        with patch.object(statusline, '_get_git_status_cache_file', return_value=cache_file):
+            yield cache_file
+
     def test_normal_branch_and_status(self, tmp_path):
         git_dir = tmp_path / '.git'
         git_dir.mkdir()
@@ -1151,6 +1358,26 @@ class TestGetGitInfo:
         assert modified == 0
         assert untracked == 0
 
+    def test_status_cached_until_index_changes(self, tmp_path):
+        git_dir = tmp_path / '.git'
+        git_dir.mkdir()
+        (git_dir / 'HEAD').write_text('ref: refs/heads/main\n')
+        index = git_dir / 'index'
+        index.write_text('v1')
+
+        with patch('subprocess.run') as mock_run:
+            mock_run.return_value = MagicMock(stdout=" M a.py\n", returncode=0)
+            assert statusline.get_git_info(str(tmp_path)) == ('main', 1, 0)
+            # 2回目: HEAD/index 不変 + TTL 内 → subprocess を呼ばない
+            assert statusline.get_git_info(str(tmp_path)) == ('main', 1, 0)
+            assert mock_run.call_count == 1
+
+            # index 更新（git add 等）→ 再計算
+            os.utime(index, ns=(0, index.stat().st_mtime_ns + 1_000_000))
+            mock_run.return_value = MagicMock(stdout="M  a.py\n?? b.py\n", returncode=0)
+            assert statusline.get_git_info(str(tmp_path)) == ('main', 1, 1)
+            assert mock_run.call_count == 2
+
 
 # ============================================
 # Test Group 3: convert_utc_to_local() / convert_local_to_utc()
@@ -1184,6 +1411,20 @@ class TestTimezoneConversions:
         assert result.tzinfo == timezone.utc
         assert result.hour == 12
 
+    def test_parse_ts_z_suffix(self):
+        result = statusline._parse_ts('2026-02-26T05:00:00.123Z')
+        assert result == datetime(2026, 2, 26, 5, 0, 0, 123000, tzinfo=timezone.utc)
+
+    def test_parse_ts_offset(self):
+        result = statusline._parse_ts('2026-02-26T14:00:00+09:00')
+        assert result.astimezone(timezone.utc).hour == 5
+
+    def test_parse_ts_naive_utc(self):
+        expected = datetime(2026, 2, 26, 5, 0, 0, 123000)
+        assert statusline._parse_ts_naive_utc('2026-02-26T05:00:00.123Z') == expected
+        assert statusline._parse_ts_naive_utc('2026-02-26T14:00:00.123+09:00') == expected
+        assert statusline._parse_ts_naive_utc('2026-02-26T05:00:00.123') == expected
+
 
 class TestGetApiSessionTimeRange:
     """Window display must show the actual 5h boundaries (resets_at is
@@ -1281,6 +1522,146 @@ class TestDetectFiveHourBlocks:
         assert len(blocks) == 1
         assert blocks[0]['is_active'] is True
 
+    def test_messages_older_than_six_hours_excluded(self):
+        """Cutoff via bisect drops old messages; tz-aware timestamps are normalized."""
+        now = datetime.now(timezone.utc)
+        msgs = [
+            self._make_msg((now - timedelta(hours=8)).astimezone()),
+            self._make_msg((now - timedelta(hours=7)).astimezone()),
+            self._make_msg((now - timedelta(minutes=10)).astimezone()),
+            self._make_msg(now - timedelta(minutes=5)),
+        ]
+        blocks = statusline.detect_five_hour_blocks(msgs)
+        assert len(blocks) == 1
+        assert len(blocks[0]['messages']) == 2
+
+    def test_index_blocks_by_session_prefers_latest(self):
+        old = {'messages': [{'session_id': 'a'}, {'sessionId': 'b'}]}
+        new = {'messages': [{'session_id': 'a'}, {}]}
+        index = statusline._index_blocks_by_session([old, new])
+        assert index['a'] is new
+        assert index['b'] is old
+        assert None not in index
+
+    def test_find_current_session_block_fallback_with_and_without_index(self):
+        past = datetime(2000, 1, 1)
+        old = {'start_time': past, 'end_time': past,
+               'messages': [{'session_id': 'a'}, {'sessionId': 'b'}]}
+        new = {'start_time': past, 'end_time': past,
+               'messages': [{'session_id': 'a'}]}
+        blocks = [old, new]
+        index = statusline._index_blocks_by_session(blocks)
+        for session_index in (None, index):
+            find = statusline.find_current_session_block
+            assert find(blocks, 'a', session_index) is new
+            assert find(blocks, 'b', session_index) is old
+            assert find(blocks, 'c', session_index) is None
+
+
+class TestDetectActivePeriods:
+    def test_pre_parsed_datetimes(self):
+        """Messages from load_all_messages_chronologically carry datetimes."""
+        base = datetime(2026, 2, 26, 5, 0, tzinfo=timezone.utc)
+        msgs = [{'timestamp': base + timedelta(minutes=m)} for m in (0, 2, 4, 30, 31)]
+        periods = statusline.detect_active_periods(msgs)
+        assert len(periods) == 2
+        assert (periods[0][1] - periods[0][0]).total_seconds() == 240
+
+    def test_iso_strings(self):
+        msgs = [{'timestamp': '2026-02-26T05:00:00Z'}, {'timestamp': '2026-02-26T05:03:00Z'}]
+        periods = statusline.detect_active_periods(msgs)
+        assert len(periods) == 1
+        assert (periods[0][1] - periods[0][0]).total_seconds() == 180
+
+    def test_invalid_timestamps_skipped(self):
+        msgs = [{'timestamp': '2026-02-26T05:00:00Z'}, {}, {'timestamp': None},
+                {'timestamp': 'garbage'}, {'timestamp': '2026-02-26T05:01:00Z'}]
+        periods = statusline.detect_active_periods(msgs)
+        assert len(periods) == 1
+        assert (periods[0][1] - periods[0][0]).total_seconds() == 60
+
+
+class TestLoadAllMessagesChronologically:
+    @pytest.fixture(autouse=True)
+    def _isolated_index(self, tmp_path, monkeypatch):
+        index_file = tmp_path / 'offset_index.json'
+        monkeypatch.setattr(statusline, '_get_transcript_offset_index_file', lambda: index_file)
+        return index_file
+
+    @staticmethod
+    def _line(ts, uuid):
+        return json.dumps({'type': 'assistant', 'timestamp': ts, 'uuid': uuid,
+                           'message': {'usage': {'input_tokens': 1}}})
+
+    def test_since_drops_old_entries(self, tmp_path):
+        f = tmp_path / 's.jsonl'
+        f.write_text('\n'.join([
+            self._line('2026-02-26T01:00:00Z', 'old'),
+            self._line('2026-02-26T06:00:00Z', 'new'),
+        ]) + '\n')
+        # mtime を since より後にしてファイル自体は読まれるようにする
+        os.utime(f, (time.time(), time.time()))
+        msgs = statusline.load_all_messages_chronologically(
+            transcript_files=[f], since=datetime(2026, 2, 26, 5, 0))
+        assert [m['uuid'] for m in msgs] == ['new']
+
+    def test_since_skips_stale_files(self, tmp_path):
+        f = tmp_path / 's.jsonl'
+        f.write_text(self._line('2026-02-26T06:00:00Z', 'x') + '\n')
+        old = datetime(2026, 2, 26, 7, 0, tzinfo=timezone.utc).timestamp()
+        os.utime(f, (old, old))
+        msgs = statusline.load_all_messages_chronologically(
+            transcript_files=[f], since=datetime(2026, 2, 26, 8, 0))
+        assert msgs == []
+
+    def test_merges_files_chronologically(self, tmp_path):
+        a = tmp_path / 'a.jsonl'
+        b = tmp_path / 'b.jsonl'
+        a.write_text('\n'.join([self._line('2026-02-26T01:00:00Z', 'a1'),
+                                self._line('2026-02-26T03:00:00Z', 'a3')]) + '\n')
+        # 追記順が前後していてもファイル内でソートされる
+        b.write_text('\n'.join([self._line('2026-02-26T04:00:00Z', 'b4'),
+                                self._line('2026-02-26T02:00:00Z', 'b2')]) + '\n')
+        msgs = statusline.load_all_messages_chronologically(transcript_files=[a, b])
+        assert [m['uuid'] for m in msgs] == ['a1', 'b2', 'a3', 'b4']
+
+    def test_offset_index_skips_old_prefix(self, tmp_path, _isolated_index):
+        f = tmp_path / 's.jsonl'
+        old_line = self._line('2026-02-26T01:00:00Z', 'old')
+        f.write_text('\n'.join([old_line, self._line('2026-02-26T06:00:00Z', 'new')]) + '\n')
+        since = datetime(2026, 2, 26, 5, 0)
+        msgs = statusline.load_all_messages_chronologically(transcript_files=[f], since=since)
+        assert [m['uuid'] for m in msgs] == ['new']
+        entry = json.loads(_isolated_index.read_text())[str(f)]
+        assert entry[2] == len(old_line) + 1
+
+        # 2 回目は古い先頭行を読まない（壊しても結果は同じ）
+        data = f.read_bytes()
+        f.write_bytes(b'x' * len(old_line) + data[len(old_line):])
+        with open(f, 'a') as fh:
+            fh.write(self._line('2026-02-26T07:00:00Z', 'newer') + '\n')
+        msgs = statusline.load_all_messages_chronologically(transcript_files=[f], since=since)
+        assert [m['uuid'] for m in msgs] == ['new', 'newer']
+
+    def test_offset_index_ignored_for_earlier_since(self, tmp_path, _isolated_index):
+        f = tmp_path / 's.jsonl'
+        f.write_text('\n'.join([self._line('2026-02-26T01:00:00Z', 'old'),
+                                 self._line('2026-02-26T06:00:00Z', 'new')]) + '\n')
+        statusline.load_all_messages_chronologically(
+            transcript_files=[f], since=datetime(2026, 2, 26, 5, 0))
+        msgs = statusline.load_all_messages_chronologically(
+            transcript_files=[f], since=datetime(2026, 2, 26, 0, 0))
+        assert [m['uuid'] for m in msgs] == ['old', 'new']
+
+    def test_carries_naive_utc_timestamp(self, tmp_path):
+        f = tmp_path / 's.jsonl'
+        f.write_text('\n'.join([self._line('2026-02-26T01:30:00Z', 'z'),
+                                 self._line('2026-02-26T10:30:00+09:00', 'jst')]) + '\n')
+        msgs = statusline.load_all_messages_chronologically(transcript_files=[f])
+        for m in msgs:
+            assert m['timestamp_utc'] == datetime(2026, 2, 26, 1, 30)
+            assert m['timestamp_utc'] == statusline._to_naive_utc(m['timestamp'])
+
 
 # ============================================
 # Test Group 5: generate_real_burn_timeline()
@@ -1765,6 +2146,79 @@ class TestWeeklyLineMeteredCost:
         assert '$' not in plain_none
         assert '$' not in plain_zero
 
+    def test_remaining_time_and_position(self):
+        rl = {'seven_day': {'utilization': 30,
+                            'resets_at': (datetime.now(timezone.utc)
+                                          + timedelta(days=2, hours=3, minutes=30)).isoformat()}}
+        plain = statusline.strip_ansi(statusline.get_weekly_line(rl))
+        assert '[30%]' in plain
+        assert ' 2d3h2' in plain  # 2d3h29m / 2d3h30m（秒境界ぶれ）
+
+
+class TestScanWeeklyTimeline:
+    @pytest.fixture(autouse=True)
+    def _isolated_cache(self, tmp_path):
+        cache_file = tmp_path / '.weekly_file_cache.json'
+        with patch.object(statusline, '_get_weekly_file_cache_file', return_value=cache_file):
+            yield cache_file
+
+    @staticmethod
+    def _entry(ts, msg_id, tokens=100, entry_type='assistant'):
+        return json.dumps({
+            'timestamp': ts.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+            'type': entry_type,
+            'requestId': f'req_{msg_id}',
+            'message': {'id': msg_id, 'model': 'claude-sonnet-4-6',
+                        'usage': {'input_tokens': tokens, 'output_tokens': 0}},
+        })
+
+    def test_buckets_window_and_dedups(self, tmp_path):
+        now = datetime.now(timezone.utc)
+        resets_at = now + timedelta(days=1)
+        lines = [
+            self._entry(now - timedelta(days=8), 'old'),           # 窓の外
+            self._entry(now - timedelta(hours=1), 'a'),
+            self._entry(now - timedelta(hours=1), 'a'),             # 重複
+            self._entry(now - timedelta(hours=1), 'u', entry_type='user'),
+            'not json',
+        ]
+        transcript = tmp_path / 'session.jsonl'
+        transcript.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        with patch.object(statusline, 'find_all_transcript_files', return_value=[transcript]):
+            timeline, _ = statusline._scan_weekly_timeline(resets_at.isoformat(), 20)
+        assert sum(timeline) == 100
+        assert timeline[-3] == 100
+
+    def test_empty_and_usage_free_files_skipped(self, tmp_path):
+        resets_at = datetime.now(timezone.utc) + timedelta(days=1)
+        empty = tmp_path / 'empty.jsonl'
+        empty.write_bytes(b'')
+        no_usage = tmp_path / 'no_usage.jsonl'
+        no_usage.write_text('{"type":"user","timestamp":"2026-01-01T00:00:00Z"}\n')
+        good = tmp_path / 'good.jsonl'
+        good.write_text(self._entry(datetime.now(timezone.utc) - timedelta(hours=2), 'g', tokens=7) + '\n')
+        with patch.object(statusline, 'find_all_transcript_files', return_value=[empty, no_usage, good]):
+            timeline, _ = statusline._scan_weekly_timeline(resets_at.isoformat(), 20)
+        assert sum(timeline) == 7
+
+    def test_unchanged_files_served_from_cache(self, tmp_path):
+        now = datetime.now(timezone.utc)
+        resets_at = (now + timedelta(days=1)).isoformat()
+        first = tmp_path / 'a.jsonl'
+        first.write_text(self._entry(now - timedelta(hours=2), 'x', tokens=5) + '\n')
+        # resume 先の transcript に同じ応答が残っていてもファイル間で 1 回だけ数える
+        resumed = tmp_path / 'b.jsonl'
+        resumed.write_text(self._entry(now - timedelta(hours=2), 'x', tokens=5) + '\n'
+                           + self._entry(now - timedelta(hours=1), 'y', tokens=3) + '\n')
+        files = [first, resumed]
+        with patch.object(statusline, 'find_all_transcript_files', return_value=files):
+            timeline, _ = statusline._scan_weekly_timeline(resets_at, 20)
+            assert sum(timeline) == 8
+            with patch.object(statusline, '_scan_weekly_file') as rescan:
+                cached_timeline, _ = statusline._scan_weekly_timeline(resets_at, 20)
+            rescan.assert_not_called()
+        assert cached_timeline == timeline
+
 
 # ============================================
 # Test Group 7: Formatter smoke tests
@@ -2009,6 +2463,112 @@ class TestFindSessionTranscript:
         assert result is None
 
 
+class TestCalculateTokensSinceTime:
+    def test_sums_usage_after_start_with_dedup(self, tmp_path):
+        def line(ts, msg_id, **usage):
+            return json.dumps({'timestamp': ts, 'requestId': 'r', 'type': 'assistant',
+                               'message': {'id': msg_id, 'usage': usage}})
+        transcript = tmp_path / 's1.jsonl'
+        transcript.write_text('\n'.join([
+            line('2026-02-26T04:00:00Z', 'a', input_tokens=1000),       # 開始前
+            line('2026-02-26T05:10:00Z', 'b', input_tokens=10, output_tokens=5,
+                 cache_read_input_tokens=100),
+            line('2026-02-26T05:10:00Z', 'b', input_tokens=10, output_tokens=5),  # 重複
+            line('2026-02-26T05:20:00Z', 'c', cache_creation_input_tokens=7),
+            '{"type":"user","timestamp":"2026-02-26T05:30:00Z","message":null}',
+        ]) + '\n')
+        start = datetime(2026, 2, 26, 5, 0, tzinfo=timezone.utc)
+        with patch.object(statusline, 'find_session_transcript', return_value=transcript):
+            assert statusline.calculate_tokens_since_time(start, 's1') == 122
+
+    def test_start_boundary_and_offset_timestamps(self, tmp_path):
+        transcript = tmp_path / 's1.jsonl'
+        transcript.write_text('\n'.join(json.dumps(
+            {'timestamp': ts, 'message': {'usage': {'input_tokens': n}}}) for ts, n in [
+                ('2026-02-26T05:00:00.400Z', 1),      # 同じ秒だが開始前
+                ('2026-02-26T05:00:00.600Z', 10),     # 同じ秒で開始後
+                ('2026-02-26T13:59:00+09:00', 100),   # = 04:59Z（開始前）
+                ('2026-02-26T14:01:00+09:00', 1000),  # = 05:01Z
+            ]) + '\n')
+        start = datetime(2026, 2, 26, 5, 0, 0, 500000, tzinfo=timezone.utc)
+        with patch.object(statusline, 'find_session_transcript', return_value=transcript):
+            assert statusline.calculate_tokens_since_time(start, 's1') == 1010
+
+    def test_missing_inputs(self):
+        assert statusline.calculate_tokens_since_time(None, 's1') == 0
+        assert statusline.calculate_tokens_since_time(datetime.now(timezone.utc), None) == 0
+
+
+class TestLogError:
+    def test_repeated_error_written_once(self, tmp_path, monkeypatch):
+        log_file = str(tmp_path / 'statusline-error.log')
+        monkeypatch.setattr(statusline, 'ERROR_LOG_FILE', log_file)
+        statusline._log_error("boom\nInput data: x\n")
+        statusline._log_error("boom\nInput data: x\n")
+        statusline._log_error("other\n")
+        text = open(log_file).read()
+        assert text.count('boom') == 1
+        assert text.endswith(': other\n')
+
+    def test_repeat_outside_window_written(self, tmp_path, monkeypatch):
+        log_file = str(tmp_path / 'statusline-error.log')
+        monkeypatch.setattr(statusline, 'ERROR_LOG_FILE', log_file)
+        statusline._log_error("boom\n")
+        old = time.time() - statusline.ERROR_LOG_REPEAT_WINDOW - 1
+        os.utime(log_file, (old, old))
+        statusline._log_error("boom\n")
+        assert open(log_file).read().count('boom') == 2
+
+
+class TestFindAllTranscriptFiles:
+    def test_filters_by_extension_and_mtime(self, tmp_path):
+        project = tmp_path / '.claude' / 'projects' / 'p1'
+        project.mkdir(parents=True)
+        fresh = project / 'fresh.jsonl'
+        fresh.write_text('{}\n')
+        stale = project / 'stale.jsonl'
+        stale.write_text('{}\n')
+        old = time.time() - 10 * 3600
+        os.utime(stale, (old, old))
+        (project / 'notes.txt').write_text('x')
+        (tmp_path / '.claude' / 'projects' / 'loose.jsonl').write_text('{}\n')
+
+        with patch.object(Path, 'home', return_value=tmp_path):
+            recent = statusline.find_all_transcript_files(hours_limit=6)
+            everything = statusline.find_all_transcript_files(hours_limit=None)
+        assert recent == [fresh]
+        assert sorted(p.name for p in everything) == ['fresh.jsonl', 'stale.jsonl']
+
+    def test_missing_projects_dir(self, tmp_path):
+        with patch.object(Path, 'home', return_value=tmp_path):
+            assert statusline.find_all_transcript_files() == []
+
+
+class TestGetRealTimeBurnData:
+    def _entry(self, minutes_ago, tokens):
+        ts = (datetime.now(timezone.utc) - timedelta(minutes=minutes_ago)).isoformat().replace('+00:00', 'Z')
+        return json.dumps({'type': 'assistant', 'timestamp': ts,
+                           'message': {'usage': {'input_tokens': tokens}}})
+
+    def test_no_session(self):
+        assert statusline.get_real_time_burn_data(None) == []
+
+    def test_minute_buckets(self, tmp_path):
+        transcript = tmp_path / 's.jsonl'
+        transcript.write_text('\n'.join([
+            self._entry(45, 999),      # outside 30-min window
+            self._entry(29.5, 100),
+            self._entry(29.4, 50),
+            self._entry(0.5, 7),
+        ]) + '\n')
+        with patch.object(statusline, 'find_session_transcript', return_value=transcript):
+            rates = statusline.get_real_time_burn_data('s')
+        assert len(rates) == 30
+        assert rates[0] == 150
+        assert rates[29] == 7
+        assert sum(rates) == 157
+
+
 # ============================================
 # Test Group 10: format_schedule_line()
 # ============================================
@@ -2188,3 +2748,48 @@ class TestSmokeExtended:
         assert result.returncode == 0
         lines = result.stdout.strip().split('\n')
         assert len(lines) <= 2, f"--show 1,2 should be <= 2 lines, got {len(lines)}"
+
+
+class TestParseCliArgs:
+    def test_no_args_returns_defaults(self):
+        args = statusline._parse_cli_args([])
+        assert args.show is None
+        assert not (args.schedule or args.update or args.self_update or args.rollback
+                    or args.setup or args.version or args.help)
+
+    def test_flags_parsed_and_unknown_ignored(self):
+        args = statusline._parse_cli_args(['--show', '1,2', '--schedule', '--bogus'])
+        assert args.show == '1,2'
+        assert args.schedule is True
+        assert args.version is False
+
+
+class TestParseEventTime:
+    def test_all_day_event(self):
+        dt, all_day = statusline.parse_event_time({'start': {'date': '2026-03-01'}})
+        assert dt == datetime(2026, 3, 1)
+        assert all_day is True
+
+    def test_invalid_all_day_date_raises(self):
+        with pytest.raises(ValueError):
+            statusline.parse_event_time({'start': {'date': '2026-3-1x'}})
+
+
+class TestGetTerminalSize:
+    def test_env_override_skips_probes(self, monkeypatch):
+        monkeypatch.setenv('COLUMNS', '120')
+        monkeypatch.setenv('LINES', '40')
+        monkeypatch.setenv('TMUX', '/tmp/tmux-0/default,1,0')
+        with patch('subprocess.run') as mock_run:
+            assert statusline.get_terminal_size() == (119, 40)
+        mock_run.assert_not_called()
+
+    def test_partial_override_probes_other_dimension(self, monkeypatch):
+        monkeypatch.setenv('COLUMNS', '120')
+        monkeypatch.delenv('LINES', raising=False)
+        monkeypatch.delenv('TMUX', raising=False)
+        monkeypatch.setattr(statusline.sys.stdout, 'isatty', lambda: False, raising=False)
+        with patch('subprocess.run') as mock_run:
+            mock_run.return_value = MagicMock(returncode=0, stdout='33\n')
+            assert statusline.get_terminal_size() == (119, 33)
+        assert [c.args[0] for c in mock_run.call_args_list] == [['tput', 'lines']]